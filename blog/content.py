@@ -0,0 +1,233 @@
+"""
+Blog posts, compiled from Markdown files into an on-disk index.
+
+Posts are Markdown files in BLOG_POSTS_DIR with a front matter block:
+
+    ---
+    title: Building TempHist
+    date: 2025-06-01
+    tags: Flutter, Python
+    summary: One line shown in listings.
+    ---
+
+The slug is the file name without `.md` unless the front matter sets one, run
+through slugify() either way, and `draft: true` leaves a post out. A post whose
+slug or tag has nothing left once slugified fails the build with a ValueError,
+as its URL couldn't be reversed. `manage.py build_blog` renders every post once
+with the project's markdown renderer and writes two files to BLOG_ROOT:
+
+- posts-<hash>.html: the rendered posts, one after another
+- index.json: post metadata newest first, the byte offset and length of each
+  post's HTML, the slug -> post and tag -> posts lookups, and the blob's name
+
+get_blog() reads the index once (again only when it is rebuilt) and
+memory-maps the blob, so listings, tag pages and posts are lookups and slices
+with no parsing per request. Without a built index, e.g. in development, the
+posts are compiled in memory and recompiled when a file changes.
+"""
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.text import slugify
+
+from core.markdown import convert_markdown_to_html
+
+INDEX_NAME = 'index.json'
+
+_blog = {'key': None, 'index': None}
+_blog_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class BlogTag:
+    name: str
+    slug: str
+    url: str
+
+
+@dataclass(frozen=True, slots=True)
+class BlogPost:
+    slug: str
+    title: str
+    date: datetime.date
+    summary: str
+    tags: tuple
+    url: str
+    offset: int
+    length: int
+
+
+class BlogIndex:
+    """The loaded index: posts newest first, lookups and the rendered HTML."""
+
+    def __init__(self, data, html):
+        self.version = data['version']
+        tags = {
+            slug: BlogTag(tag['name'], slug, reverse('blog_tag', args=[slug]))
+            for slug, tag in data['tags'].items()
+        }
+        self.posts = tuple(
+            BlogPost(
+                slug=post['slug'],
+                title=post['title'],
+                date=datetime.date.fromisoformat(post['date']),
+                summary=post['summary'],
+                tags=tuple(tags[slug] for slug in post['tags']),
+                url=reverse('blog_post', args=[post['slug']]),
+                offset=post['offset'],
+                length=post['length'],
+            )
+            for post in data['posts']
+        )
+        self.by_slug = {slug: self.posts[position] for slug, position in data['slugs'].items()}
+        self.tags = tags
+        self.by_tag = {
+            slug: tuple(self.posts[position] for position in tag['posts'])
+            for slug, tag in data['tags'].items()
+        }
+        self._html = html
+
+    def html(self, post):
+        """Return the rendered HTML of a post."""
+        return self._html[post.offset:post.offset + post.length].decode()
+
+
+# Compiling
+
+def parse_post(path):
+    """Return (front matter dict, Markdown body) for a post file."""
+    with open(path, encoding='utf-8') as post_file:
+        text = post_file.read()
+    meta = {}
+    if text.startswith('---\n'):
+        header, _, text = text[4:].partition('\n---\n')
+        for line in header.splitlines():
+            key, separator, value = line.partition(':')
+            if separator:
+                meta[key.strip().lower()] = value.strip()
+    return meta, text.lstrip('\n')
+
+
+def compile_posts(posts_dir):
+    """Render every post in posts_dir; returns (index data, HTML blob bytes)."""
+    try:
+        names = sorted(name for name in os.listdir(posts_dir) if name.endswith('.md'))
+    except FileNotFoundError:
+        names = []
+
+    posts = []
+    for name in names:
+        meta, body = parse_post(os.path.join(posts_dir, name))
+        if meta.get('draft', '').lower() == 'true':
+            continue
+        try:
+            date = datetime.date.fromisoformat(meta['date'])
+        except (KeyError, ValueError):
+            raise ValueError(f'{name}: front matter needs a date as YYYY-MM-DD')
+        slug = slugify(meta.get('slug') or name[:-3])
+        if not slug:
+            raise ValueError(f'{name}: slug {meta.get("slug") or name[:-3]!r} has no letters or digits')
+        tag_names = [tag.strip() for tag in meta.get('tags', '').split(',') if tag.strip()]
+        for tag_name in tag_names:
+            if not slugify(tag_name):
+                raise ValueError(f'{name}: tag {tag_name!r} has no letters or digits')
+        posts.append({
+            'slug': slug,
+            'title': meta.get('title') or name[:-3],
+            'date': date.isoformat(),
+            'summary': meta.get('summary', ''),
+            'tag_names': tag_names,
+            'html': convert_markdown_to_html(body).encode(),
+        })
+    posts.sort(key=lambda post: (post['date'], post['slug']), reverse=True)
+
+    blob = bytearray()
+    tags = {}
+    slugs = {}
+    for position, post in enumerate(posts):
+        if post['slug'] in slugs:
+            raise ValueError(f'Two posts have the slug {post["slug"]!r}')
+        slugs[post['slug']] = position
+        post['offset'], post['length'] = len(blob), len(post['html'])
+        blob += post.pop('html')
+        post['tags'] = []
+        for tag_name in post.pop('tag_names'):
+            tag = tags.setdefault(slugify(tag_name), {'name': tag_name, 'posts': []})
+            if not tag['posts'] or tag['posts'][-1] != position:
+                tag['posts'].append(position)
+                post['tags'].append(slugify(tag_name))
+
+    blob = bytes(blob)
+    data = {'posts': posts, 'slugs': slugs, 'tags': tags}
+    data['version'] = hashlib.sha256(json.dumps(data, sort_keys=True).encode() + blob).hexdigest()[:16]
+    return data, blob
+
+
+def write_index(data, blob, root=None):
+    """Write the blob and then atomically replace the index in root (BLOG_ROOT by default)."""
+    root = root or settings.BLOG_ROOT
+    os.makedirs(root, exist_ok=True)
+    name = f'posts-{hashlib.sha256(blob).hexdigest()[:16]}.html'
+    path = os.path.join(root, name)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'wb') as blob_file:
+            blob_file.write(blob)
+        os.replace(path + '.tmp', path)
+
+    index_path = os.path.join(root, INDEX_NAME)
+    with open(index_path + '.tmp', 'w') as index_file:
+        json.dump(dict(data, file=name), index_file, separators=(',', ':'), sort_keys=True)
+    os.replace(index_path + '.tmp', index_path)
+
+    # Remove blobs the index no longer refers to; workers that still have one
+    # mapped keep reading it until they reload
+    for other in os.listdir(root):
+        if other.startswith('posts-') and other != name:
+            os.remove(os.path.join(root, other))
+    return name
+
+
+# Loading
+
+def _map(path):
+    with open(path, 'rb') as blob_file:
+        if os.fstat(blob_file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _posts_state():
+    """Return a fingerprint of the post files, for the in-memory fallback."""
+    try:
+        entries = sorted(os.scandir(settings.BLOG_POSTS_DIR), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return ()
+    return tuple((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.name.endswith('.md'))
+
+
+def get_blog():
+    """Return the BlogIndex, reloading it if it was rebuilt."""
+    index_path = os.path.join(settings.BLOG_ROOT, INDEX_NAME)
+    try:
+        key = ('index', os.stat(index_path).st_mtime_ns)
+    except OSError:
+        key = ('posts', _posts_state())
+
+    with _blog_lock:
+        if key != _blog['key']:
+            if key[0] == 'index':
+                with open(index_path) as index_file:
+                    data = json.load(index_file)
+                html = _map(os.path.join(settings.BLOG_ROOT, data['file']))
+            else:
+                data, html = compile_posts(settings.BLOG_POSTS_DIR)
+            _blog['index'] = BlogIndex(data, html)
+            _blog['key'] = key
+        return _blog['index']
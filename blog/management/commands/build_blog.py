@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.content import compile_posts, write_index
+
+
+class Command(BaseCommand):
+    help = 'Compile the Markdown posts in BLOG_POSTS_DIR into the blog index in BLOG_ROOT'
+
+    def handle(self, *args, **options):
+        try:
+            data, blob = compile_posts(settings.BLOG_POSTS_DIR)
+        except ValueError as e:
+            raise CommandError(str(e))
+        name = write_index(data, blob)
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {len(data["posts"])} posts and {len(data["tags"])} tags into {settings.BLOG_ROOT} ({name}, {len(blob)} bytes)'
+        ))
@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .content import BlogIndex, compile_posts
+
+
+class CompilePostsTests(SimpleTestCase):
+
+    def setUp(self):
+        posts_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(posts_dir.cleanup)
+        self.posts_dir = posts_dir.name
+
+    def write_post(self, name, front_matter):
+        with open(os.path.join(self.posts_dir, name), 'w') as post_file:
+            post_file.write(f'---\ndate: 2025-06-01\n{front_matter}\n---\nBody\n')
+
+    def test_slugs_are_slugified(self):
+        self.write_post('Building TempHist.md', 'tags: Flutter, C++')
+        self.write_post('other.md', 'slug: Another Post/Part 2')
+        blog = BlogIndex(*compile_posts(self.posts_dir))
+        self.assertEqual(sorted(blog.by_slug), ['another-postpart-2', 'building-temphist'])
+        self.assertEqual(blog.by_slug['building-temphist'].url, '/blog/building-temphist/')
+        self.assertEqual(sorted(blog.tags), ['c', 'flutter'])
+
+    def test_empty_slug(self):
+        self.write_post('post.md', 'slug: ???')
+        with self.assertRaisesMessage(ValueError, "post.md: slug '???' has no letters or digits"):
+            compile_posts(self.posts_dir)
+
+    def test_empty_tag_slug(self):
+        self.write_post('post.md', 'tags: Python, ++')
+        with self.assertRaisesMessage(ValueError, "post.md: tag '++' has no letters or digits"):
+            compile_posts(self.posts_dir)
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import post_detail_view, post_list_view, tag_view
+
+urlpatterns = [
+    path("", post_list_view, name="blog"),
+    path("page/<int:page>/", post_list_view, name="blog_page"),
+    path("tag/<str:tag_slug>/", tag_view, name="blog_tag"),
+    path("tag/<str:tag_slug>/page/<int:page>/", tag_view, name="blog_tag_page"),
+    path("<str:slug>/", post_detail_view, name="blog_post"),
+]
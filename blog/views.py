@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.views.decorators.http import condition
+from core.conditional import page_etag
+from core.metrics import render
+from .content import get_blog
+
+
+def blog_etag(request, slug=None, tag_slug=None, page=1):
+    """ETag for blog pages, which only change when the index is rebuilt."""
+    blog = get_blog()
+    if slug is not None and slug not in blog.by_slug:
+        return None
+    if tag_slug is not None and tag_slug not in blog.tags:
+        return None
+    if slug is None and paginate(blog.by_tag[tag_slug] if tag_slug else blog.posts, page) is None:
+        return None
+    return page_etag(request.resolver_match.view_name, blog.version, slug or '', tag_slug or '', page)
+
+
+def paginate(posts, page):
+    """Return the requested page of posts, or None if it doesn't exist."""
+    try:
+        return Paginator(posts, settings.BLOG_POSTS_PER_PAGE, allow_empty_first_page=True).page(page)
+    except InvalidPage:
+        return None
+
+@condition(etag_func=blog_etag)
+def post_list_view(request, page=1):
+    """List blog posts, newest first."""
+    posts = paginate(get_blog().posts, page)
+    if posts is None:
+        return render(request, "blog/404.html", status=404)
+
+    return render(request, "blog/post_list.html", {"posts": posts})
+
+@condition(etag_func=blog_etag)
+def tag_view(request, tag_slug, page=1):
+    """List the blog posts with a tag."""
+    blog = get_blog()
+    tag = blog.tags.get(tag_slug)
+    posts = paginate(blog.by_tag.get(tag_slug, ()), page) if tag else None
+    if posts is None:
+        return render(request, "blog/404.html", status=404)
+
+    return render(request, "blog/post_list.html", {"posts": posts, "tag": tag})
+
+@condition(etag_func=blog_etag)
+def post_detail_view(request, slug):
+    """Show a blog post."""
+    blog = get_blog()
+    post = blog.by_slug.get(slug)
+    if not post:
+        return render(request, "blog/404.html", status=404)
+
+    return render(request, "blog/post_detail.html", {"post": post, "content": blog.html(post)})
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    actions = ['retry']
+
+    @admin.action(description='Retry selected messages')
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutboxMessage.SENT).update(
+            status=OutboxMessage.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
@@ -0,0 +1,118 @@
+"""
+Helpers for `manage.py bench`.
+
+- StubUpstream: a local HTTP server standing in for raw.githubusercontent.com,
+  answering every GET with a generated README after a configurable delay, and
+  with a 503 for a configurable fraction of requests.
+- summarize(): latency percentiles and throughput of a set of timings.
+- compare(): the results that regressed past a stored baseline.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubUpstream:
+    """Serve body on 127.0.0.1 from a background thread."""
+
+    def __init__(self, body, latency=0.0, failure_rate=0.0):
+        self.body = body.encode()
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(stub.latency)
+                failed = random.random() < stub.failure_rate
+                with stub._lock:
+                    stub.requests += 1
+                    stub.failures += failed
+                if failed:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(stub.body)))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(timings, elapsed):
+    """Return p50/p95/p99 in milliseconds and requests per second."""
+    timings = sorted(timings)
+    return {
+        'p50': percentile(timings, 0.50) * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+        'rps': len(timings) / elapsed if elapsed else 0.0,
+    }
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, metric, baseline, result) for every regression.
+
+    Latencies ('p95', 'ms') regress when they exceed the baseline by more than
+    tolerance (e.g. 0.25 for 25%), throughput ('rps') when it falls below it
+    by more than that. Results missing from the baseline are not compared.
+    """
+    regressions = []
+    for section in ('routes', 'markdown'):
+        for name, result in results.get(section, {}).items():
+            expected = baseline.get(section, {}).get(name)
+            if not expected:
+                continue
+            for metric in ('p95', 'ms'):
+                if metric in expected and result[metric] > expected[metric] * (1 + tolerance):
+                    regressions.append((name, metric, expected[metric], result[metric]))
+            if 'rps' in expected and result['rps'] < expected['rps'] * (1 - tolerance):
+                regressions.append((name, 'rps', expected['rps'], result['rps']))
+    return regressions
@@ -0,0 +1,222 @@
+"""
+Two-tier cache backend: a bounded in-process LRU (L1) in front of a shared
+cache (L2, any Django cache alias).
+
+- Reads try L1, then L2; L2 hits are promoted into L1.
+- Writes, deletes and incr/decr go through to L2 and update or drop the L1
+  copy. Other processes keep their own L1 copy until it expires, so L1 entries
+  live at most L1_TIMEOUT seconds, or the namespace's timeout in L1_TIMEOUTS
+  for keys whose values never change once set.
+- L1 holds pickled values, evicting least recently used entries to stay
+  within L1_MAX_BYTES; values larger than L1_MAX_ENTRY_BYTES stay in L2 only.
+- Namespaces (the part of a key before the first ':') listed in L1_BYPASS go
+  straight to L2, for keys that must be coherent across processes such as
+  locks and counters.
+- Hits and misses are counted per namespace; see stats().
+
+Configured in settings.CACHES:
+
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'tiered',
+        'OPTIONS': {'L2': 'shared', 'L1_MAX_BYTES': 32 * 1024 * 1024, ...},
+    }
+"""
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+# Shared by every thread's instance of the backend, like LocMemCache
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _L1:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = defaultdict(Counter)
+
+
+def namespace(key):
+    return key.split(':', 1)[0] if ':' in key else ''
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.max_bytes = options.get('L1_MAX_BYTES', 32 * 1024 * 1024)
+        self.max_entry_bytes = options.get('L1_MAX_ENTRY_BYTES', 1024 * 1024)
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1_timeouts = options.get('L1_TIMEOUTS', {})
+        self.bypass = frozenset(options.get('L1_BYPASS', ()))
+        with _stores_lock:
+            self._l1 = _stores.setdefault(location, _L1())
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    # L1
+
+    def _l1_get(self, key, version):
+        l1 = self._l1
+        with l1.lock:
+            entry = l1.entries.get((key, version))
+            if entry is None:
+                return _MISSING
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                self._l1_pop((key, version))
+                return _MISSING
+            l1.entries.move_to_end((key, version))
+        return pickle.loads(data)
+
+    def _l1_set(self, key, version, value, timeout=DEFAULT_TIMEOUT):
+        if namespace(key) in self.bypass:
+            return
+        l1_timeout = self.l1_timeouts.get(namespace(key), self.l1_timeout)
+        timeout = l1_timeout if timeout is DEFAULT_TIMEOUT or timeout is None else min(timeout, l1_timeout)
+        if timeout <= 0:
+            self._l1_delete(key, version)
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_entry_bytes:
+            self._l1_delete(key, version)
+            return
+
+        l1 = self._l1
+        with l1.lock:
+            self._l1_pop((key, version))
+            l1.entries[(key, version)] = (time.monotonic() + timeout, data)
+            l1.bytes += len(data)
+            while l1.bytes > self.max_bytes:
+                _, (_, evicted) = l1.entries.popitem(last=False)
+                l1.bytes -= len(evicted)
+
+    def _l1_pop(self, l1_key):
+        # Caller holds the lock
+        entry = self._l1.entries.pop(l1_key, None)
+        if entry is not None:
+            self._l1.bytes -= len(entry[1])
+
+    def _l1_delete(self, key, version):
+        with self._l1.lock:
+            self._l1_pop((key, version))
+
+    def _count(self, key, outcome):
+        with self._l1.lock:
+            self._l1.stats[namespace(key)][outcome] += 1
+
+    def stats(self):
+        """Return {namespace: {'l1_hits', 'l2_hits', 'misses'}} for this process."""
+        with self._l1.lock:
+            return {
+                name: {outcome: counts[outcome] for outcome in ('l1_hits', 'l2_hits', 'misses')}
+                for name, counts in self._l1.stats.items()
+            }
+
+    def l1_usage(self):
+        """Return (entries, bytes) currently held in L1."""
+        with self._l1.lock:
+            return len(self._l1.entries), self._l1.bytes
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        if namespace(key) not in self.bypass:
+            value = self._l1_get(key, version)
+            if value is not _MISSING:
+                self._count(key, 'l1_hits')
+                return value
+
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count(key, 'misses')
+            return default
+        self._count(key, 'l2_hits')
+        self._l1_set(key, version, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            value = _MISSING if namespace(key) in self.bypass else self._l1_get(key, version)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                self._count(key, 'l1_hits')
+                found[key] = value
+
+        if remaining:
+            fetched = self.l2.get_many(remaining, version=version)
+            for key in remaining:
+                if key in fetched:
+                    self._count(key, 'l2_hits')
+                    self._l1_set(key, version, fetched[key])
+                else:
+                    self._count(key, 'misses')
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key in failed:
+                self._l1_delete(key, version)
+            else:
+                self._l1_set(key, version, value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(key, version, value, timeout)
+        else:
+            self._l1_delete(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None and timeout <= 0:
+            self._l1_delete(key, version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(key, version)
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(key, version)
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        return self.l2.decr(key, delta, version=version)
+
+    def clear(self):
+        with self._l1.lock:
+            self._l1.entries.clear()
+            self._l1.bytes = 0
+        self.l2.clear()
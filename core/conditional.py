@@ -0,0 +1,77 @@
+"""
+Validators for conditional GET support on the public pages.
+
+Views are wrapped in django.views.decorators.http.condition with ETag and
+Last-Modified functions built from these helpers, so If-None-Match and
+If-Modified-Since requests get a 304 before any template is rendered or README
+fetched. Every ETag includes a digest of the project's own templates and the
+static files manifest hash, so a deploy that changes a template or a hashed
+asset also changes the ETags.
+"""
+import datetime
+import functools
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+
+def _template_files():
+    # The project's own templates only; Django's bundled ones don't change
+    # without a deploy that also touches requirements.txt
+    roots = [str(path) for path in settings.TEMPLATES[0]['DIRS']]
+    for app_config in apps.get_app_configs():
+        if app_config.path.startswith(str(settings.BASE_DIR)):
+            roots.append(os.path.join(app_config.path, 'templates'))
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                yield root, os.path.join(dirpath, filename)
+
+
+@functools.lru_cache(maxsize=None)
+def templates_state():
+    """Return (digest, latest mtime) over the project's template files.
+
+    The stylesheet is included too, as pages inline their critical CSS.
+    """
+    digest = hashlib.sha256()
+    latest = 0
+    paths = [path for _, path in _template_files()]
+    stylesheet = finders.find('css/output.css')
+    if stylesheet:
+        paths.append(stylesheet)
+    for path in paths:
+        with open(path, 'rb') as template_file:
+            digest.update(path.encode() + b'\0' + template_file.read())
+        latest = max(latest, os.path.getmtime(path))
+    return digest.hexdigest(), latest
+
+
+def page_etag(*parts):
+    """Return a strong ETag for a page rendered from the given input digests."""
+    digest = hashlib.sha256(templates_state()[0].encode())
+    # Pages link to hashed static files, which a deploy can replace
+    digest.update(b'\0' + getattr(staticfiles_storage, 'manifest_hash', '').encode())
+    for part in parts:
+        digest.update(b'\0' + str(part).encode())
+    return digest.hexdigest()[:32]
+
+
+def page_last_modified(*timestamps):
+    """Return the Last-Modified datetime for a page built from sources with these mtimes."""
+    latest = max(templates_state()[1], *timestamps)
+    return datetime.datetime.fromtimestamp(int(latest), tz=datetime.timezone.utc)
+
+
+def has_csrf_cookie(request):
+    """Return True if the visitor already holds a CSRF cookie.
+
+    Pages with forms only answer 304 to visitors with a cookie, because the
+    token in their cached copy is only valid alongside it.
+    """
+    return settings.CSRF_COOKIE_NAME in request.COOKIES
@@ -0,0 +1,8 @@
+from .pagecache import CSRF_PLACEHOLDER
+
+
+def page_cache_csrf(request):
+    """Render a CSRF placeholder into pages that are being stored in the page cache."""
+    if getattr(request, 'page_cache_miss', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
@@ -0,0 +1,262 @@
+"""
+Per-template critical CSS.
+
+Each page template, together with the templates it extends or includes and
+the classes set on form widgets, only uses a fraction of the Tailwind
+stylesheet (theme/static/css/output.css). prune() keeps the rules whose
+selectors only use classes that appear in those sources: element rules,
+preflight and variables are always kept, and @keyframes are kept when a kept
+rule refers to them. The {% critical_css_link %} tag inlines that subset in the
+page head and loads the full stylesheet without blocking rendering.
+
+`manage.py build_critical_css` (run after collectstatic) writes the subsets to
+CRITICAL_CSS_ROOT with a manifest recording the hash of the stylesheet they
+were computed from. Templates missing from the manifest, or a manifest built
+from another stylesheet (e.g. in development), are pruned on first use and
+kept in memory, keyed by the stylesheet hash.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template import loader
+
+from .conditional import _template_files
+
+STYLESHEET = 'css/output.css'
+MANIFEST_NAME = 'manifest.json'
+
+TEMPLATE_REFERENCE_RE = re.compile(r'{%\s*(?:extends|include)\s+["\']([^"\']+)["\']')
+PYTHON_CLASS_RE = re.compile(r'["\']class["\']\s*:\s*["\']([^"\']+)["\']')
+TOKEN_SPLIT_RE = re.compile(r'[\s"\'`<>=]+')
+SELECTOR_CLASS_RE = re.compile(r'\.((?:\\.|[\w-])+)')
+ESCAPE_RE = re.compile(r'\\(.)')
+LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+KEYFRAMES_RE = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+
+_stylesheet = {'mtime': None, 'css': '', 'hash': ''}
+_manifest = {'mtime': None, 'data': {}}
+_pruned = {}
+
+
+def stylesheet():
+    """Return (css, sha256) of the Tailwind stylesheet, re-reading it if rebuilt."""
+    path = finders.find(STYLESHEET)
+    mtime = os.stat(path).st_mtime
+    if mtime != _stylesheet['mtime']:
+        with open(path) as css_file:
+            css = css_file.read()
+        _stylesheet.update(mtime=mtime, css=css, hash=hashlib.sha256(css.encode()).hexdigest())
+    return _stylesheet['css'], _stylesheet['hash']
+
+
+# Parsing
+
+def parse(css):
+    """Split css into a list of (prelude, body) blocks.
+
+    body is the declaration text for style rules and @keyframes, and a nested
+    list of blocks for other at-rules with blocks (@media, @supports).
+    """
+    blocks = []
+    index = 0
+    length = len(css)
+    while index < length:
+        start = css.find('{', index)
+        if start == -1:
+            break
+        prelude = _strip_comments(css[index:start]).strip()
+        end = _matching_brace(css, start)
+        body = css[start + 1:end]
+        if prelude.startswith('@') and not prelude.startswith(('@keyframes', '@-webkit-keyframes', '@font-face', '@page')):
+            body = parse(body)
+        blocks.append((prelude, body))
+        index = end + 1
+    return blocks
+
+
+def _strip_comments(text):
+    return re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+
+
+def _matching_brace(css, start):
+    depth = 0
+    index = start
+    while index < len(css):
+        char = css[index]
+        if char == '/' and css.startswith('/*', index):
+            index = css.index('*/', index) + 2
+            continue
+        if char in '"\'':
+            index = css.index(char, index + 1) + 1
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return len(css)
+
+
+def _split_selectors(prelude):
+    selectors = []
+    depth = 0
+    current = []
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    selectors.append(''.join(current).strip())
+    return selectors
+
+
+def serialize(blocks):
+    """Return the CSS for blocks, with the line breaks and indentation removed."""
+    parts = []
+    for prelude, body in blocks:
+        prelude = LINE_BREAK_RE.sub(' ', prelude)
+        if isinstance(body, list):
+            parts.append(f'{prelude}{{{serialize(body)}}}')
+        else:
+            parts.append(f'{prelude}{{{LINE_BREAK_RE.sub("", body.strip())}}}')
+    return ''.join(parts)
+
+
+# Pruning
+
+def prune(blocks, tokens):
+    """Return the blocks whose selectors only use classes in tokens."""
+    kept = _prune(blocks, tokens)
+    rules = serialize([block for block in kept if not KEYFRAMES_RE.match(block[0])])
+    return [
+        block for block in kept
+        if not KEYFRAMES_RE.match(block[0])
+        or re.search(r'\b%s\b' % re.escape(KEYFRAMES_RE.match(block[0]).group(1)), rules)
+    ]
+
+
+def _prune(blocks, tokens):
+    kept = []
+    for prelude, body in blocks:
+        if isinstance(body, list):
+            nested = _prune(body, tokens)
+            if nested:
+                kept.append((prelude, nested))
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [
+                selector for selector in _split_selectors(prelude)
+                if all(ESCAPE_RE.sub(r'\1', name) in tokens for name in SELECTOR_CLASS_RE.findall(selector))
+            ]
+            if selectors:
+                kept.append((', '.join(selectors), body))
+    return kept
+
+
+# Template sources
+
+@functools.cache
+def python_tokens():
+    """Return the classes set in Python code of the project's apps, e.g. form widgets."""
+    tokens = set()
+    for app_config in apps.get_app_configs():
+        if not app_config.path.startswith(str(settings.BASE_DIR)):
+            continue
+        for dirpath, dirnames, filenames in os.walk(app_config.path):
+            dirnames[:] = [name for name in dirnames if name not in ('migrations', 'node_modules', 'static')]
+            for filename in filenames:
+                if filename.endswith('.py'):
+                    with open(os.path.join(dirpath, filename)) as source_file:
+                        for classes in PYTHON_CLASS_RE.findall(source_file.read()):
+                            tokens.update(classes.split())
+    return tokens
+
+
+def template_tokens(template_name, seen=None):
+    """Return every word in a template and the templates it extends or includes."""
+    seen = set() if seen is None else seen
+    if template_name in seen:
+        return set()
+    seen.add(template_name)
+
+    source = loader.get_template(template_name).template.source
+    tokens = set(TOKEN_SPLIT_RE.split(source))
+    for reference in TEMPLATE_REFERENCE_RE.findall(source):
+        tokens |= template_tokens(reference, seen)
+    return tokens
+
+
+def page_templates():
+    """Return the names of the templates that extend a base template."""
+    names = []
+    for root, path in _template_files():
+        if path.endswith('.html'):
+            with open(path) as template_file:
+                if '{% extends' in template_file.read():
+                    names.append(os.path.relpath(path, root).replace(os.sep, '/'))
+    return names
+
+
+def compute(template_name):
+    """Return the critical CSS for template_name."""
+    css, _ = stylesheet()
+    return serialize(prune(parse(css), template_tokens(template_name) | python_tokens()))
+
+
+# Artifacts
+
+def write_manifest(css_hash, templates, root=None):
+    root = root or settings.CRITICAL_CSS_ROOT
+    path = os.path.join(root, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump({'stylesheet': css_hash, 'templates': templates}, manifest_file, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _load_manifest():
+    path = os.path.join(settings.CRITICAL_CSS_ROOT, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    if mtime != _manifest['mtime']:
+        with open(path) as manifest_file:
+            _manifest['data'] = json.load(manifest_file)
+        _manifest['mtime'] = mtime
+    return _manifest['data']
+
+
+@functools.lru_cache(maxsize=64)
+def _read_artifact(path):
+    with open(path) as css_file:
+        return css_file.read()
+
+
+def get_critical_css(template_name):
+    """Return the critical CSS for template_name, from the build or computed once."""
+    _, css_hash = stylesheet()
+    manifest = _load_manifest()
+    if manifest.get('stylesheet') == css_hash and template_name in manifest['templates']:
+        try:
+            return _read_artifact(os.path.join(settings.CRITICAL_CSS_ROOT, manifest['templates'][template_name]))
+        except OSError:
+            pass
+
+    key = (css_hash, template_name)
+    if key not in _pruned:
+        _pruned[key] = compute(template_name)
+    return _pruned[key]
@@ -0,0 +1,236 @@
+"""
+Static export of the public site, for `manage.py export_site`.
+
+Every public page is rendered through the Django test client and written to
+EXPORT_ROOT as <path>/index.html with .gz (and, with brotli installed, .br)
+copies beside it, which exported_site_middleware serves with WhiteNoise ahead
+of Django when SERVE_EXPORTED_SITE is set, or which can be uploaded to a CDN.
+
+The CSRF token in exported forms is replaced by CSRF_PLACEHOLDER (as in the
+page cache) and CSRF_SCRIPT fetches a real one from /csrf/ the first time a
+visitor touches the form. Form submissions are POSTs, which
+exported_site_middleware passes on to the views, so they render the result
+(sent message, validation errors) as before.
+
+export.json records each page's ETag and a hash of its HTML. Re-exports send
+the ETag as If-None-Match, so the views answer 304 for pages whose inputs
+(templates, catalog entry, README) are unchanged and only the rest are
+rendered again; files are only rewritten when their HTML changed. It also
+records the catalog version the pages were exported from: once the catalog is
+edited in the admin, the exported pages are out of date, and Django renders
+them again until the next export.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import sync_and_async_middleware
+from whitenoise.compress import Compressor
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from blog import content
+from projects import catalog, docs
+
+from .pagecache import CSRF_PLACEHOLDER
+
+MANIFEST_NAME = 'export.json'
+FILE_CHUNK_SIZE = 64 * 1024
+
+CSRF_INPUT = re.compile(rb'(<input type="hidden" name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+CSRF_SCRIPT = f"""<script>
+        // Exported page: fetch a CSRF token when a form is first used
+        document.addEventListener('DOMContentLoaded', function() {{
+            const inputs = document.querySelectorAll('input[name="csrfmiddlewaretoken"][value="{CSRF_PLACEHOLDER}"]');
+            let token = null;
+            function fetchToken() {{
+                token = token || fetch('/csrf/', {{credentials: 'same-origin'}})
+                    .then(function(response) {{ return response.json(); }})
+                    .then(function(data) {{ inputs.forEach(function(input) {{ input.value = data.token; }}); }});
+                return token;
+            }}
+            inputs.forEach(function(input) {{
+                const form = input.form;
+                form.addEventListener('focusin', fetchToken, {{once: true}});
+                form.addEventListener('submit', function(event) {{
+                    if (input.value === '{CSRF_PLACEHOLDER}') {{
+                        event.preventDefault();
+                        fetchToken().then(function() {{ form.submit(); }});
+                    }}
+                }});
+            }});
+        }});
+    </script>
+"""
+
+
+def site_urls():
+    """Return the path of every public page in the catalog and the blog.
+
+    Documentation pages are only included once build_docs has pre-rendered
+    their README; the others are left to Django, which fetches it live.
+    """
+    urls = ['/', '/contact/', '/support/', '/projects/']
+    urls.extend(f'/projects/tech/{slug}/' for slug in sorted(catalog.tech_counts()))
+    built = docs.load_manifest()
+    for project in catalog.get_projects().values():
+        urls.append(project.url)
+        urls.extend(repo.url for repo in project.repositories if repo.readme_url in built)
+
+    blog = content.get_blog()
+    per_page = settings.BLOG_POSTS_PER_PAGE
+    urls.append(reverse('blog'))
+    urls.extend(reverse('blog_page', args=[page]) for page in range(2, math.ceil(len(blog.posts) / per_page) + 1))
+    for slug, posts in blog.by_tag.items():
+        urls.append(reverse('blog_tag', args=[slug]))
+        urls.extend(reverse('blog_tag_page', args=[slug, page]) for page in range(2, math.ceil(len(posts) / per_page) + 1))
+    urls.extend(post.url for post in blog.posts)
+    return urls
+
+
+def static_version():
+    """Return the staticfiles manifest hash, which every page's asset URLs depend on."""
+    return getattr(staticfiles_storage, 'manifest_hash', '')
+
+
+def exportable_html(content):
+    """Return a page's HTML with the CSRF token left to CSRF_SCRIPT."""
+    content, forms = CSRF_INPUT.subn(rb'\g<1>' + CSRF_PLACEHOLDER.encode() + rb'\g<2>', content)
+    if forms:
+        content = content.replace(b'</body>', CSRF_SCRIPT.encode() + b'</body>', 1)
+    return content
+
+
+def page_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def page_path(root, url):
+    return os.path.join(root, url.strip('/'), 'index.html')
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {'static': None, 'catalog': None, 'pages': {}}
+
+
+def write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        manifest_file.write('\n')
+    os.replace(path + '.tmp', path)
+
+
+def write_page(root, url, content):
+    """Write a page and its compressed copies."""
+    path = page_path(root, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for suffix in ('.gz', '.br'):
+        # Compressor skips copies that don't save enough; don't leave old ones
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    with open(path, 'wb') as page_file:
+        page_file.write(content)
+    for _ in Compressor(quiet=True).compress(path):
+        pass
+
+
+def remove_page(root, url):
+    path = page_path(root, url)
+    for suffix in ('', '.gz', '.br'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    # Drop directories left empty, up to the export root
+    directory = os.path.dirname(path)
+    while os.path.abspath(directory) != os.path.abspath(root) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+async def _file_chunks(file):
+    try:
+        while chunk := file.read(FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+def async_serve(static_file, request):
+    """Return WhiteNoise's response for static_file with an async body.
+
+    WhiteNoise's own response iterates the file synchronously, which Django
+    can only send under ASGI through a thread for every chunk. The files are
+    local and small, so they are read on the event loop, like the
+    documentation artifacts.
+    """
+    response = static_file.get_response(request.method, request.META)
+    status = int(response.status)
+    if response.file is None:
+        http_response = HttpResponse(status=status)
+    else:
+        http_response = StreamingHttpResponse(_file_chunks(response.file), status=status)
+    # WhiteNoise sets the Content-Type, and every other header
+    del http_response['Content-Type']
+    for key, value in response.headers:
+        http_response[key] = value
+    return http_response
+
+
+@sync_and_async_middleware
+def exported_site_middleware(get_response):
+    """Serve static files and the exported pages with WhiteNoise, ahead of Django.
+
+    Requests other than GET and HEAD go to Django, as WhiteNoise would answer
+    them with a 405 and stop the contact forms on exported pages being posted.
+    Exported pages are only served while the catalog is the one they were
+    exported from. Unlike WhiteNoiseMiddleware this runs natively under ASGI:
+    requests for the async documentation views don't hop to a thread to get
+    past it, and files are sent with async bodies (async_serve).
+    """
+    whitenoise = WhiteNoiseMiddleware(get_response)
+    exported_catalog = load_manifest(settings.EXPORT_ROOT).get('catalog')
+
+    def find_file(request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if whitenoise.autorefresh:
+            return whitenoise.find_file(request.path_info)
+        return whitenoise.files.get(request.path_info)
+
+    def is_page(request):
+        return not request.path_info.startswith(whitenoise.static_prefix)
+
+    def current(request):
+        """Return False for an exported page made from an older catalog."""
+        return not is_page(request) or catalog.catalog_version() == exported_catalog
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            static_file = find_file(request)
+            if static_file is not None:
+                if is_page(request) and catalog.check_due():
+                    await sync_to_async(catalog.get_catalog)()
+                if current(request):
+                    return async_serve(static_file, request)
+            return await get_response(request)
+    else:
+        def middleware(request):
+            static_file = find_file(request)
+            if static_file is not None:
+                if is_page(request):
+                    catalog.get_catalog()
+                if current(request):
+                    return whitenoise.serve(static_file, request)
+            return get_response(request)
+    return middleware
@@ -0,0 +1,55 @@
+"""
+Cached template fragments for the catalog's project and repository cards.
+
+{% fragment 'repo_card' project.slug repo.slug %}...{% endfragment %} renders
+its contents once per catalog version and serves them from the default cache
+afterwards. Keys include the catalog version, a digest of the templates and
+the static files manifest, so editing the catalog or deploying new templates
+or assets invalidates every fragment; there is nothing to delete.
+
+Entries never change under a key, so the 'fragment' namespace is kept in L1
+for FRAGMENT_CACHE_L1_TIMEOUT seconds (see settings.CACHES) and cards are
+normally served from process memory. Hits and misses are counted per fragment
+name; see stats().
+"""
+import hashlib
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+
+from projects.catalog import catalog_version
+
+from .conditional import templates_state
+
+KEY_PREFIX = 'fragment:'
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def cache_key(name, vary_on):
+    parts = [templates_state()[0], getattr(staticfiles_storage, 'manifest_hash', ''), *map(str, vary_on)]
+    digest = hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+    return f'{KEY_PREFIX}{name}:{catalog_version()}:{digest}'
+
+
+def get_or_render(name, vary_on, render):
+    """Return the cached fragment, calling render() to build it on a miss."""
+    key = cache_key(name, vary_on)
+    content = cache.get(key)
+    outcome = 'hits' if content is not None else 'misses'
+    if content is None:
+        content = render()
+        cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+    with _stats_lock:
+        _stats[name][outcome] += 1
+    return content
+
+
+def stats():
+    """Return {fragment name: {'hits', 'misses'}} for this process."""
+    with _stats_lock:
+        return {name: {'hits': counts['hits'], 'misses': counts['misses']} for name, counts in _stats.items()}
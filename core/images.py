@@ -0,0 +1,117 @@
+"""
+Responsive variants of the raster images in static/.
+
+`manage.py build_images` (run before collectstatic) resizes every PNG and JPEG
+in static/assets to each width in RESPONSIVE_IMAGE_WIDTHS up to the image's
+own width, in AVIF (when Pillow supports it) and WebP, and writes them to
+static/responsive/ with an images.json manifest of the variants and the
+original dimensions. collectstatic then gives the variants content-hashed
+names like any other static file.
+
+The {% responsive_image %} tag (core.templatetags.images) reads the manifest
+to emit <picture> markup with srcset and explicit dimensions. Pillow is only
+imported when building, so serving pages never loads it.
+"""
+import json
+import os
+
+from django.conf import settings
+
+SOURCE_DIR = 'assets'
+OUTPUT_DIR = 'responsive'
+MANIFEST_NAME = 'images.json'
+EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# MIME type -> (Pillow format, extension, save options), best first
+FORMATS = {
+    'image/avif': ('AVIF', 'avif', {'quality': 60}),
+    'image/webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+}
+
+_manifest = {'mtime': None, 'images': {}}
+
+
+def static_root():
+    """Return the static/ source directory the images are read from and written to."""
+    return str(settings.STATICFILES_DIRS[0])
+
+
+def available_formats():
+    """Return the FORMATS entries this Pillow build can write."""
+    from PIL import features
+
+    return {
+        mime_type: spec for mime_type, spec in FORMATS.items()
+        if features.check(spec[1])
+    }
+
+
+def variant_widths(width):
+    """Return the variant widths for an image width, never upscaling."""
+    widths = {w for w in settings.RESPONSIVE_IMAGE_WIDTHS if w < width}
+    widths.add(width)
+    return sorted(widths)
+
+
+def build_image(name, root=None):
+    """Write the variants of static/<name>; returns its manifest entry."""
+    from PIL import Image
+
+    root = root or static_root()
+    base, _ = os.path.splitext(name)
+    entry = {'sources': {}}
+
+    with Image.open(os.path.join(root, name)) as image:
+        image.load()
+        entry['width'], entry['height'] = image.size
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        for mime_type, (image_format, extension, options) in available_formats().items():
+            sources = entry['sources'][mime_type] = []
+            for width in variant_widths(image.width):
+                variant = f'{OUTPUT_DIR}/{base}-{width}w.{extension}'
+                path = os.path.join(root, variant)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(os.path.join(root, name)):
+                    height = round(image.height * width / image.width)
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    resized.save(path, image_format, **options)
+                sources.append([variant, width])
+    return entry
+
+
+def find_images(root=None):
+    """Return the static names of the images to build variants for."""
+    root = root or static_root()
+    names = []
+    for dirpath, dirnames, filenames in os.walk(os.path.join(root, SOURCE_DIR)):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(EXTENSIONS):
+                names.append(os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/'))
+    return names
+
+
+def write_manifest(images, root=None):
+    root = root or static_root()
+    path = os.path.join(root, OUTPUT_DIR, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump({'images': images}, manifest_file, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def load_manifest():
+    """Return the {static name: entry} map, reloading it if rebuilt."""
+    path = os.path.join(static_root(), OUTPUT_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    if mtime != _manifest['mtime']:
+        with open(path) as manifest_file:
+            _manifest['images'] = json.load(manifest_file)['images']
+        _manifest['mtime'] = mtime
+    return _manifest['images']
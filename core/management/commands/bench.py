@@ -0,0 +1,192 @@
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import bench, upstream
+from core.management.commands.bench_markdown import SIZES, build_document, time_conversion
+from projects import catalog
+
+
+def catalog_routes():
+    """Return the routes to benchmark, picking slugs from the catalog."""
+    routes = ['/', '/contact/', '/support/', '/projects/']
+    tech_counts = catalog.tech_counts()
+    if tech_counts:
+        routes.append(f'/projects/tech/{max(tech_counts, key=tech_counts.get)}/')
+
+    projects = catalog.get_projects()
+    project = projects.get('temphist') or next(iter(projects.values()), None)
+    if project:
+        routes.append(project.url)
+        routes.extend(repo.url for repo in project.repositories)
+    return routes
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every public route and markdown conversion against a stubbed GitHub'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Timed requests per route (default 200)',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Untimed requests per route before timing (default 5)',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Clients sending requests at the same time (default 1)',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request, so each one renders and fetches from scratch',
+        )
+        parser.add_argument(
+            '--upstream-latency', type=float, default=50,
+            help='Milliseconds the stub GitHub takes to answer (default 50)',
+        )
+        parser.add_argument(
+            '--upstream-failure-rate', type=float, default=0.0,
+            help='Fraction of stub GitHub requests answered with a 503 (default 0)',
+        )
+        parser.add_argument(
+            '--readme-size', type=int, default=10,
+            help='Size in KB of the README the stub serves (default 10)',
+        )
+        parser.add_argument(
+            '--markdown-min-time', type=float, default=0.5,
+            help='Minimum seconds to time each markdown document size; 0 skips them (default 0.5)',
+        )
+        parser.add_argument(
+            '--baseline', default=str(settings.BASE_DIR / 'bench-baseline.json'),
+            help='Baseline results to compare against (default bench-baseline.json)',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Record these results in the baseline file instead of comparing',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Fraction a result may be worse than the baseline before failing (default 0.25)',
+        )
+
+    def handle(self, *args, **options):
+        stub = bench.StubUpstream(
+            build_document(options['readme_size'] * 1024),
+            latency=options['upstream_latency'] / 1000,
+            failure_rate=options['upstream_failure_rate'],
+        )
+        # A cache and docs directory of its own, so nothing pre-rendered or
+        # cached by the development server skews the results
+        bench_caches = {
+            'default': dict(settings.CACHES['default'], LOCATION='bench'),
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench',
+                'OPTIONS': {'MAX_ENTRIES': 10000},
+            },
+        }
+        with stub, tempfile.TemporaryDirectory() as docs_root, override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=bench_caches,
+            DOCS_ROOT=docs_root,
+            UPSTREAM_OVERRIDE_URL=stub.url,
+        ):
+            upstream.reset_pools()
+            catalog.get_catalog()
+            results = {'routes': self.bench_routes(options), 'markdown': self.bench_markdown(options)}
+            cache.clear()
+
+        self.stdout.write(f'Stub GitHub: {stub.requests} requests, {stub.failures} failed')
+        self.check_baseline(results, options)
+
+    def bench_routes(self, options):
+        mode = 'cold' if options['cold'] else 'warm'
+        results = {}
+        self.stdout.write(f'{"route (" + mode + ")":<40} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>8} {"errors":>6}')
+        for path in catalog_routes():
+            timings, errors, elapsed = self.time_route(path, options)
+            result = bench.summarize(timings, elapsed)
+            results[f'{mode} {path}'] = result
+            self.stdout.write(
+                f'{path:<40} {result["p50"]:8.2f} {result["p95"]:8.2f} {result["p99"]:8.2f} '
+                f'{result["rps"]:8.1f} {errors:>6}'
+            )
+        return results
+
+    def time_route(self, path, options):
+        """Return (timings in seconds, error responses, elapsed seconds) for path."""
+        client = Client()
+        for _ in range(options['warmup']):
+            client.get(path)
+
+        concurrency = max(1, options['concurrency'])
+        counts = [options['requests'] // concurrency + (i < options['requests'] % concurrency) for i in range(concurrency)]
+
+        def run(count):
+            client = Client()
+            timings = []
+            errors = 0
+            try:
+                for _ in range(count):
+                    if options['cold']:
+                        cache.clear()
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    timings.append(time.perf_counter() - started)
+                    errors += response.status_code >= 400
+            finally:
+                connections.close_all()
+            return timings, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            outcomes = list(executor.map(run, counts))
+        elapsed = time.perf_counter() - started
+        return [t for timings, _ in outcomes for t in timings], sum(errors for _, errors in outcomes), elapsed
+
+    def bench_markdown(self, options):
+        results = {}
+        if options['markdown_min_time'] <= 0:
+            return results
+        for label, size in SIZES:
+            best, runs = time_conversion(build_document(size), options['markdown_min_time'])
+            results[f'markdown {label}'] = {'ms': best * 1000}
+            self.stdout.write(f'markdown {label:>6}: {best * 1000:9.2f} ms (best of {runs} runs)')
+        return results
+
+    def check_baseline(self, results, options):
+        path = options['baseline']
+        if options['save_baseline']:
+            # Keep the results of the other mode (warm or cold)
+            try:
+                saved = bench.load_baseline(path)
+            except FileNotFoundError:
+                saved = {}
+            for section, section_results in results.items():
+                saved.setdefault(section, {}).update(section_results)
+            bench.save_baseline(path, saved)
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {path}'))
+            return
+
+        try:
+            baseline = bench.load_baseline(path)
+        except FileNotFoundError:
+            self.stdout.write(f'No baseline at {path}; run with --save-baseline to create one')
+            return
+
+        regressions = bench.compare(results, baseline, options['tolerance'])
+        for name, metric, expected, actual in regressions:
+            self.stderr.write(f'{name}: {metric} {actual:.2f} vs baseline {expected:.2f}')
+        if regressions:
+            raise CommandError(f'{len(regressions)} results regressed more than {options["tolerance"]:.0%} past the baseline')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
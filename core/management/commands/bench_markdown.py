@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.markdown import convert_markdown_to_html
+
+# A README section using every construct the converter handles; repeated to
+# build documents of the benchmark sizes.
+SAMPLE_SECTION = """# TempHist API
+
+A **FastAPI** service that serves *historical* temperature data. See the
+[documentation](https://github.com/turnpiece/TempHist-API) for details.
+
+## Installation
+
+1. Clone the repository
+2. Install the dependencies with `pip install -r requirements.txt`
+3. Copy `.env.example` to `.env`
+
+```bash
+# Install dependencies
+pip install -r requirements.txt
+uvicorn main:app --reload
+```
+
+### Endpoints
+
+- `GET /data/{location}/{date}` returns the **average** temperature
+- `GET /trend/{location}/{date}` returns the *trend* over 50 years
+* Responses are cached in Redis
+
+Requests are rate limited per API key. Contact [support](mailto:support@turnpiece.com)
+if you need a higher limit.
+
+"""
+
+SIZES = [('10 KB', 10 * 1024), ('100 KB', 100 * 1024), ('1 MB', 1024 * 1024)]
+
+
+def build_document(size):
+    """Return a README of roughly size bytes made of repeated sample sections."""
+    repeats = max(1, size // len(SAMPLE_SECTION))
+    return SAMPLE_SECTION * repeats
+
+
+def time_conversion(document, min_time):
+    """Return (best seconds, runs) converting document for at least min_time."""
+    convert_markdown_to_html(document)  # Warm up
+
+    runs = 0
+    best = float('inf')
+    started = time.perf_counter()
+    while runs < 3 or time.perf_counter() - started < min_time:
+        run_started = time.perf_counter()
+        convert_markdown_to_html(document)
+        best = min(best, time.perf_counter() - run_started)
+        runs += 1
+    return best, runs
+
+
+class Command(BaseCommand):
+    help = 'Benchmark README markdown conversion on 10 KB, 100 KB and 1 MB documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-time', type=float, default=1.0,
+            help='Minimum seconds to spend timing each document size (default 1.0)',
+        )
+
+    def handle(self, *args, **options):
+        for label, size in SIZES:
+            document = build_document(size)
+            best, runs = time_conversion(document, options['min_time'])
+            throughput = len(document) / best / (1024 * 1024)
+            self.stdout.write(
+                f'{label:>7}: {best * 1000:9.2f} ms per document, '
+                f'{throughput:7.1f} MB/s (best of {runs} runs)'
+            )
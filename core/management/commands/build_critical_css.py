@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import critical_css
+
+
+class Command(BaseCommand):
+    help = 'Write the critical CSS of every page template (run after collectstatic)'
+
+    def handle(self, *args, **options):
+        root = str(settings.CRITICAL_CSS_ROOT)
+        os.makedirs(root, exist_ok=True)
+        full, css_hash = critical_css.stylesheet()
+
+        templates = {}
+        for name in critical_css.page_templates():
+            css = critical_css.compute(name)
+            filename = name.replace('/', '__').removesuffix('.html') + '.css'
+            with open(os.path.join(root, filename), 'w') as css_file:
+                css_file.write(css)
+            templates[name] = filename
+            self.stdout.write(f'{name}: {len(css) / 1024:.1f} KB')
+        critical_css.write_manifest(css_hash, templates, root)
+
+        # Remove files of templates that no longer exist
+        keep = set(templates.values()) | {critical_css.MANIFEST_NAME}
+        for filename in os.listdir(root):
+            if filename not in keep:
+                os.remove(os.path.join(root, filename))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote critical CSS for {len(templates)} templates to {root} (full stylesheet {len(full) / 1024:.1f} KB)'
+        ))
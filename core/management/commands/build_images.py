@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive AVIF/WebP variants of the images in static/assets (run before collectstatic)'
+
+    def handle(self, *args, **options):
+        root = images.static_root()
+        manifest = {}
+        for name in images.find_images(root):
+            entry = images.build_image(name, root)
+            manifest[name] = entry
+            variants = sum(len(sources) for sources in entry['sources'].values())
+            self.stdout.write(f'{name}: {variants} variants')
+        images.write_manifest(manifest, root)
+
+        # Remove variants of images that no longer exist
+        keep = {variant for entry in manifest.values() for sources in entry['sources'].values() for variant, _ in sources}
+        output = os.path.join(root, images.OUTPUT_DIR)
+        for dirpath, _, filenames in os.walk(output):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if filename != images.MANIFEST_NAME and name not in keep:
+                    os.remove(path)
+
+        formats = ', '.join(spec[1].upper() for spec in images.available_formats().values())
+        self.stdout.write(self.style.SUCCESS(f'Built {formats} variants of {len(manifest)} images in {output}'))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Build the site search index in SEARCH_ROOT from the catalog, the documentation and the blog'
+
+    def handle(self, *args, **options):
+        data, blob = search.build(search.site_documents(), search.sources())
+        name = search.write_index(data, blob)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(data["documents"])} documents, {len(data["terms"])} terms and '
+            f'{data["postings"]} postings into {settings.SEARCH_ROOT} ({name}, {len(blob)} bytes)'
+        ))
@@ -0,0 +1,109 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import export
+from projects import catalog
+
+
+class Command(BaseCommand):
+    help = 'Render every public page to static, precompressed HTML in EXPORT_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Number of pages to render concurrently (default 8)',
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Render every page, even those whose inputs are unchanged',
+        )
+
+    def handle(self, *args, **options):
+        root = settings.EXPORT_ROOT
+        os.makedirs(root, exist_ok=True)
+
+        catalog.get_catalog()
+        urls = export.site_urls()
+        previous = export.load_manifest(root)
+        # New static file names change the asset URLs in every page
+        full = options['full'] or previous['static'] != export.static_version()
+        local = threading.local()
+
+        def render(url):
+            """Export one page; returns (url, manifest entry or None, outcome)."""
+            if not hasattr(local, 'client'):
+                local.client = Client()
+                # Pages with forms only send an ETag to visitors with a CSRF cookie
+                local.client.cookies[settings.CSRF_COOKIE_NAME] = 'export'
+            entry = previous['pages'].get(url)
+            exists = os.path.exists(export.page_path(root, url))
+            headers = {}
+            if entry and entry['etag'] and exists and not full:
+                headers['If-None-Match'] = entry['etag']
+
+            response = local.client.get(url, headers=headers)
+            if response.status_code == 304:
+                return url, entry, 'unchanged'
+            if response.status_code != 200:
+                return url, None, f'status {response.status_code}'
+
+            content = export.exportable_html(response.content)
+            digest = export.page_hash(content)
+            if entry and entry['sha256'] == digest and exists:
+                outcome = 'unchanged'
+            else:
+                export.write_page(root, url, content)
+                outcome = 'written'
+            return url, {'etag': response.get('ETag'), 'sha256': digest}, outcome
+
+        def run(url):
+            try:
+                return render(url)
+            except Exception as e:
+                return url, None, str(e)
+            finally:
+                connections.close_all()
+
+        pages = {}
+        counts = {'written': 0, 'unchanged': 0, 'failed': 0}
+        # WHITENOISE_ROOT=None: pages are rendered by Django, not served from the last export
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], SECURE_SSL_REDIRECT=False, WHITENOISE_ROOT=None,
+        ):
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                for url, entry, outcome in executor.map(run, urls):
+                    if entry is None:
+                        counts['failed'] += 1
+                        if url in previous['pages']:
+                            pages[url] = previous['pages'][url]
+                            self.stderr.write(f'{url}: {outcome}; keeping the previous export')
+                        else:
+                            self.stderr.write(f'{url}: {outcome}')
+                        continue
+                    pages[url] = entry
+                    counts[outcome] += 1
+                    if outcome == 'written' or options['verbosity'] > 1:
+                        self.stdout.write(f'{url}: {outcome}')
+
+        # Remove pages that are no longer public (or no longer pre-rendered)
+        for url in previous['pages']:
+            if url not in pages:
+                export.remove_page(root, url)
+                self.stdout.write(f'{url}: removed')
+
+        export.write_manifest(root, {
+            'static': export.static_version(),
+            'catalog': catalog.catalog_version(),
+            'pages': pages,
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {len(urls)} pages to {root}: {counts["written"]} written, '
+            f'{counts["unchanged"]} unchanged, {counts["failed"]} failed'
+        ))
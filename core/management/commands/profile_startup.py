@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter with -X importtime; prints the phase timings as
+# JSON on its last line of stdout
+PROFILE_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+phases = dict()
+
+def phase(name, since):
+    now = time.perf_counter()
+    phases[name] = now - since
+    return now
+
+import django
+from django.core.{server} import get_{server}_application
+t = phase('import Django', started)
+application = get_{server}_application()
+t = phase('django.setup() and application', t)
+from django.urls import get_resolver
+get_resolver().url_patterns
+t = phase('URLconf', t)
+if {warm}:
+    from core import startup
+    startup.warm()
+    t = phase('core.startup.warm()', t)
+from django.test import Client
+response = Client(SERVER_NAME='localhost').get('/')
+t = phase('first request (%d)' % response.status_code, t)
+print(json.dumps(phases))
+'''
+
+
+def parse_importtime(stderr):
+    """Return [(module, self us, cumulative us, depth)] from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Profile worker start-up: import time per module and time to the first response'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Number of modules and packages to list (default 20)',
+        )
+        parser.add_argument(
+            '--server', choices=['asgi', 'wsgi'], default='asgi',
+            help='Application entry point to load (default asgi)',
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Run core.startup.warm() before the first request, as gunicorn does',
+        )
+
+    def handle(self, *args, **options):
+        script = PROFILE_SCRIPT.format(server=options['server'], warm=options['warm'])
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Start-up failed:\n{result.stderr[-2000:]}')
+
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        top = options['top']
+
+        self.stdout.write('Phase')
+        for name, seconds in phases.items():
+            self.stdout.write(f'  {seconds * 1000:8.1f} ms  {name}')
+        self.stdout.write(f'  {sum(phases.values()) * 1000:8.1f} ms  total\n')
+
+        # Top-level imports only, so nested modules aren't counted twice
+        packages = defaultdict(int)
+        for name, self_us, cumulative_us, depth in modules:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write(f'Import time by package (self time of all its modules, top {top})')
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
+
+        self.stdout.write(f'\nSlowest imports including their dependencies (top {top})')
+        for name, self_us, cumulative_us, depth in sorted(modules, key=lambda module: -module[2])[:top]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {"  " * depth}{name}')
+
+        total = sum(self_us for _, self_us, _, _ in modules)
+        self.stdout.write(f'\n{len(modules)} modules imported in {total / 1000:.1f} ms')
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import metrics, outbox
+
+
+class Command(BaseCommand):
+    help = 'Send the emails queued in the outbox by the contact forms'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Messages sent per SMTP connection (default OUTBOX_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, polling for new messages every OUTBOX_POLL_INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = outbox.drain(options['batch_size'])
+            metrics.flush()
+            if sent or failed or not options['loop']:
+                self.stdout.write(f'Sent {sent} messages, {failed} failed')
+            if not options['loop']:
+                return
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,185 @@
+"""
+Markdown to HTML conversion for the GitHub README documentation pages.
+
+The renderer walks the input once, line by line, and classifies each line as a
+header, fenced code block, list item or plain text, applying the inline rules
+(bold, italic and code spans) to the line as it goes. Links, whose text may
+wrap across lines, get one substitution per run of text between code blocks,
+starting at the first line containing "[". Paragraph tags are placed with a
+final walk over the emitted lines, so the cost stays linear in the size of the
+README.
+
+Output matches the previous multi-pass regex converter, with one deliberate
+difference: the contents of fenced code blocks are emitted verbatim instead of
+being run through the header, emphasis, list and paragraph rules.
+"""
+import re
+
+BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+ITALIC_RE = re.compile(r'\*(.*?)\*')
+CODE_RE = re.compile(r'`(.*?)`')
+LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+FENCE_RE = re.compile(r'```\w*$')
+ORDERED_RE = re.compile(r'(\d+)\. ')
+BULLETS = ('* ', '- ')
+
+
+def convert_inline(text, links=True):
+    """Apply the inline rules (bold, italic, code spans, links) to one line."""
+    if '*' in text:
+        text = BOLD_RE.sub(r'<strong>\1</strong>', text)
+        text = ITALIC_RE.sub(r'<em>\1</em>', text)
+    if '`' in text:
+        text = CODE_RE.sub(r'<code>\1</code>', text)
+    if links and '](' in text:
+        text = LINK_RE.sub(r'<a href="\2">\1</a>', text)
+    return text
+
+
+def _find_fence_end(lines, start):
+    """Return the index of the first line from start containing ```, or None."""
+    for index in range(start, len(lines)):
+        if '```' in lines[index]:
+            return index
+    return None
+
+
+def _convert_links(lines, start):
+    """Convert the links in lines[start:], including ones that wrap lines."""
+    text = '\n'.join(lines[start:])
+    if '](' in text:
+        lines[start:] = LINK_RE.sub(r'<a href="\2">\1</a>', text).split('\n')
+
+
+def _wrap_paragraphs(lines):
+    """Wrap paragraphs in <p> tags.
+
+    A paragraph is a run of lines that follows a blank line, does not start
+    with a tag, and ends at the next blank line (which it consumes).
+    """
+    count = len(lines)
+    index = 0
+    while index + 2 < count:
+        if lines[index + 1] != '':
+            index += 1
+            continue
+
+        first = lines[index + 2]
+        if first == '':
+            if index + 2 == count - 1:
+                break
+            end = index + 3
+        elif first[0] == '<':
+            index += 1
+            continue
+        else:
+            end = index + 2
+
+        while end + 2 < count and lines[end + 1] != '':
+            end += 1
+        if end + 2 >= count:
+            break
+
+        lines[index + 2] = '<p>' + lines[index + 2]
+        lines[end] += '</p>'
+        index = end + 2
+
+
+def convert_markdown_to_html(markdown_text):
+    """Basic markdown to HTML conversion."""
+    lines = markdown_text.split('\n')
+    output = []
+    in_ul = False
+    in_ol = False
+    current_ol_start = 1
+    fences_closed = True
+    open_link = None
+
+    index = 0
+    count = len(lines)
+    while index < count:
+        line = lines[index]
+        index += 1
+
+        # Headers (H1 is rendered as H2)
+        if line.startswith('### '):
+            line = f'<h3>{convert_inline(line[4:], links=False)}</h3>'
+        elif line.startswith('## '):
+            line = f'<h2>{convert_inline(line[3:], links=False)}</h2>'
+        elif line.startswith('# '):
+            line = f'<h2>{convert_inline(line[2:], links=False)}</h2>'
+        else:
+            fence = FENCE_RE.search(line) if fences_closed and '```' in line and index < count else None
+            end = _find_fence_end(lines, index) if fence else None
+            if fence and end is None:
+                # An unclosed fence means no later fence can close either
+                fences_closed = False
+            if end is not None:
+                closing_line = lines[end]
+                split_at = closing_line.index('```')
+                code = '\n'.join(lines[index:end] + [closing_line[:split_at]])
+                if open_link is not None:
+                    _convert_links(output, open_link)
+                    open_link = None
+                line = (
+                    f'{convert_inline(line[:fence.start()])}<pre><code>{code}</code></pre>'
+                    f'{convert_inline(closing_line[split_at + 3:])}'
+                )
+                index = end + 1
+            else:
+                line = convert_inline(line, links=False)
+
+        # Lists: open, switch and close <ul>/<ol> around <li> lines
+        stripped = line.strip()
+        ordered = None
+        if stripped.startswith(BULLETS):
+            if line.startswith(BULLETS):
+                line = f'<li>{line[2:]}</li>'
+                stripped = line
+        else:
+            ordered = ORDERED_RE.match(stripped)
+            if ordered:
+                match = ORDERED_RE.match(line)
+                if match:
+                    line = f'<li>{line[match.end():]}</li>'
+                    stripped = line
+
+        if stripped.startswith('<li>'):
+            if ordered:
+                number = int(ordered.group(1))
+                if not in_ol:
+                    if in_ul:
+                        output.append('</ul>')
+                        in_ul = False
+                    output.append(f'<ol start="{number}">')
+                    in_ol = True
+                    current_ol_start = number
+                elif number != current_ol_start:
+                    output.append('</ol>')
+                    output.append(f'<ol start="{number}">')
+                    current_ol_start = number
+            elif not in_ul:
+                if in_ol:
+                    output.append('</ol>')
+                    in_ol = False
+                output.append('<ul>')
+                in_ul = True
+        elif in_ul:
+            output.append('</ul>')
+            in_ul = False
+        elif in_ol:
+            output.append('</ol>')
+            in_ol = False
+        output.append(line)
+        if open_link is None and '[' in line and '<pre><code>' not in line:
+            open_link = len(output) - 1
+
+    if in_ul:
+        output.append('</ul>')
+    elif in_ol:
+        output.append('</ol>')
+    if open_link is not None:
+        _convert_links(output, open_link)
+
+    _wrap_paragraphs(output)
+    return '\n'.join(output)
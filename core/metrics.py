@@ -0,0 +1,266 @@
+"""
+Request timing and Prometheus metrics.
+
+- timing(phase) times a block of work (README fetch, markdown conversion,
+  form validation, template render, ...). Inside a request the phase is added
+  to the response's Server-Timing header by timing_middleware; everywhere it
+  is also recorded in the per-phase latency histogram.
+- timing_middleware records every request in a latency histogram labelled by
+  route (the URL name), method and status.
+- incr() counts events such as upstream fetches.
+
+Each process aggregates its own metrics and writes them to its WorkerMetrics
+row at most every METRICS_FLUSH_INTERVAL seconds, so exposition() (served
+on /metrics in the Prometheus text format by core.views.metrics_view) can add
+up every worker on every instance. Rows of workers that stopped are kept for
+METRICS_RETENTION seconds, so counters don't go backwards when a worker
+restarts.
+"""
+import contextlib
+import contextvars
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Count
+from django.shortcuts import render as django_render
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from . import fragments, middleware
+from .models import OutboxMessage, WorkerMetrics
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HISTOGRAMS = {
+    'turnpiece_request_duration_seconds': 'Time to answer a request, by route, method and status',
+    'turnpiece_phase_duration_seconds': 'Time spent in a phase of handling a request, by phase',
+}
+COUNTERS = {
+    'turnpiece_upstream_requests_total': 'Upstream HTTP requests, by host and outcome',
+    'turnpiece_cache_requests_total': 'Default cache reads, by key namespace and result',
+    'turnpiece_fragment_cache_requests_total': 'Template fragment cache reads, by fragment and result',
+    'turnpiece_form_rejections_total': 'Contact form POSTs rejected before the view, by reason',
+}
+
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+_histograms = defaultdict(lambda: {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+_counters = defaultdict(float)
+_lock = threading.Lock()
+_flushed_at = {'time': time.monotonic()}
+_worker = {'pid': None, 'id': None}
+
+
+def _labels(**labels):
+    """Return labels in Prometheus syntax, used as the series key."""
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in sorted(labels.items())
+    )
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def observe(metric, seconds, **labels):
+    with _lock:
+        series = _histograms[(metric, _labels(**labels))]
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                series['buckets'][index] += 1
+        series['sum'] += seconds
+        series['count'] += 1
+
+
+def incr(metric, amount=1, **labels):
+    with _lock:
+        _counters[(metric, _labels(**labels))] += amount
+
+
+@contextlib.contextmanager
+def timing(phase):
+    """Time the enclosed block as phase (see the module docstring)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe('turnpiece_phase_duration_seconds', elapsed, phase=phase)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((phase, elapsed))
+
+
+def render(request, template_name, context=None, *args, **kwargs):
+    """django.shortcuts.render, timed as the 'render' phase."""
+    with timing('render'):
+        return django_render(request, template_name, context, *args, **kwargs)
+
+
+# Middleware
+
+def _start_request():
+    return time.perf_counter(), _request_timings.set([])
+
+
+def _finish_request(request, response, started, token):
+    elapsed = time.perf_counter() - started
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+
+    entries = [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in timings]
+    if getattr(request, 'page_cache_miss', False):
+        entries.append('page-cache;desc=miss')
+    entries.append(f'total;dur={elapsed * 1000:.1f}')
+    response['Server-Timing'] = ', '.join(entries)
+
+    match = request.resolver_match
+    route = match.view_name if match else 'unmatched'
+    observe('turnpiece_request_duration_seconds', elapsed,
+            route=route, method=request.method, status=response.status_code)
+
+
+@sync_and_async_middleware
+def timing_middleware(get_response):
+    """Add a Server-Timing header to every response and record its latency."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started, token = _start_request()
+            response = await get_response(request)
+            _finish_request(request, response, started, token)
+            if flush_due():
+                await sync_to_async(flush)()
+            return response
+    else:
+        def middleware(request):
+            started, token = _start_request()
+            response = get_response(request)
+            _finish_request(request, response, started, token)
+            if flush_due():
+                flush()
+            return response
+    return middleware
+
+
+# Aggregation across workers
+
+def _process_counters():
+    """Return this process's other statistics as counter series."""
+    series = {}
+    if hasattr(cache, 'stats'):
+        for namespace, counts in cache.stats().items():
+            for result, count in counts.items():
+                series[('turnpiece_cache_requests_total', _labels(namespace=namespace, result=result))] = count
+    for name, counts in fragments.stats().items():
+        for result, count in counts.items():
+            series[('turnpiece_fragment_cache_requests_total', _labels(fragment=name, result=result))] = count
+    for reason, count in dict(middleware.rejections).items():
+        series[('turnpiece_form_rejections_total', _labels(reason=reason))] = count
+    return series
+
+
+def snapshot():
+    """Return this process's metrics in the form stored in WorkerMetrics."""
+    with _lock:
+        histograms = {f'{metric}|{labels}': dict(series, buckets=list(series['buckets']))
+                      for (metric, labels), series in _histograms.items()}
+        counters = {f'{metric}|{labels}': value for (metric, labels), value in _counters.items()}
+    counters.update({f'{metric}|{labels}': value for (metric, labels), value in _process_counters().items()})
+    return {'histograms': histograms, 'counters': counters}
+
+
+def worker_id():
+    """Return this process's WorkerMetrics key, new in every forked worker."""
+    if _worker['pid'] != os.getpid():
+        _worker.update(pid=os.getpid(), id=f'{socket.gethostname()}:{os.getpid()}:{int(time.time())}')
+    return _worker['id']
+
+
+def flush_due():
+    return time.monotonic() - _flushed_at['time'] >= settings.METRICS_FLUSH_INTERVAL
+
+
+def flush():
+    """Write this process's metrics to its WorkerMetrics row."""
+    _flushed_at['time'] = time.monotonic()
+    try:
+        WorkerMetrics.objects.update_or_create(worker=worker_id(), defaults={'data': snapshot()})
+    except DatabaseError:
+        pass  # Metrics must never fail a request; try again next interval
+
+
+def collect():
+    """Return the metrics of every worker added up, as snapshot() does for one."""
+    flush()
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.METRICS_RETENTION)
+    WorkerMetrics.objects.filter(updated_at__lt=cutoff).delete()
+
+    histograms = defaultdict(lambda: {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+    counters = defaultdict(float)
+    for data in WorkerMetrics.objects.values_list('data', flat=True):
+        for key, series in data.get('histograms', {}).items():
+            total = histograms[key]
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], series['buckets'])]
+            total['sum'] += series['sum']
+            total['count'] += series['count']
+        for key, value in data.get('counters', {}).items():
+            counters[key] += value
+    return {'histograms': histograms, 'counters': counters}
+
+
+def _group(series_map):
+    grouped = defaultdict(list)
+    for key in sorted(series_map):
+        metric, labels = key.split('|', 1)
+        grouped[metric].append((labels, series_map[key]))
+    return grouped
+
+
+def _number(value):
+    """Format a sample value at full precision: integers as such, floats by repr."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def exposition():
+    """Return every metric in the Prometheus text exposition format."""
+    data = collect()
+    lines = []
+
+    histograms = _group(data['histograms'])
+    for metric, description in HISTOGRAMS.items():
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} histogram']
+        for labels, series in histograms.get(metric, []):
+            prefix = f'{labels},' if labels else ''
+            # Buckets are stored cumulative, as observe() counts a value in
+            # every bucket it fits
+            for bound, count in zip(BUCKETS, series['buckets']):
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {_number(count)}')
+            lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {_number(series["count"])}')
+            lines.append(f'{metric}_sum{{{labels}}} {_number(series["sum"])}')
+            lines.append(f'{metric}_count{{{labels}}} {_number(series["count"])}')
+
+    counters = _group(data['counters'])
+    for metric, description in COUNTERS.items():
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} counter']
+        for labels, value in counters.get(metric, []):
+            lines.append(f'{metric}{{{labels}}} {_number(value)}')
+
+    lines += ['# HELP turnpiece_outbox_messages Emails in the outbox, by status',
+              '# TYPE turnpiece_outbox_messages gauge']
+    outbox_counts = dict(OutboxMessage.objects.values_list('status').annotate(count=Count('pk')))
+    for status, _ in OutboxMessage.STATUS_CHOICES:
+        lines.append(f'turnpiece_outbox_messages{{{_labels(status=status)}}} {outbox_counts.get(status, 0)}')
+
+    lines += ['# HELP turnpiece_workers Worker processes that reported metrics',
+              '# TYPE turnpiece_workers gauge',
+              f'turnpiece_workers {WorkerMetrics.objects.count()}']
+    return '\n'.join(lines) + '\n'
+
@@ -0,0 +1,90 @@
+"""
+Cheap rejection of abusive contact form POSTs.
+
+form_guard_middleware runs before sessions, CSRF and the views. A POST to a
+page with a contact form is answered straight away with a fixed response when
+the client is over the rate limit (429) or filled in the honeypot field (400),
+so a flood of submissions never costs a form validation or a template render.
+Rejections are counted in `rejections`.
+"""
+import functools
+import threading
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.decorators import sync_and_async_middleware
+
+from . import ratelimit
+
+FORM_URL_NAMES = ('home', 'contact', 'support')
+HONEYPOT_FIELD = 'website'
+
+RATE_LIMITED_BODY = (
+    b'<!DOCTYPE html><html><head><title>Too many submissions</title></head><body>'
+    b'<h1>Too many submissions</h1><p>Please wait a few minutes before trying again.</p>'
+    b'<p><a href="/">Back to turnpiece.com</a></p>'
+    b'</body></html>'
+)
+REJECTED_BODY = (
+    b'<!DOCTYPE html><html><head><title>Bad request</title></head><body>'
+    b'<h1>Bad request</h1></body></html>'
+)
+
+rejections = Counter()
+_rejections_lock = threading.Lock()
+
+
+@functools.cache
+def form_paths():
+    return frozenset(reverse(name) for name in FORM_URL_NAMES)
+
+
+def check_rate_limit(request):
+    """Count a submission and return True if the client is within the limit."""
+    return ratelimit.allow(
+        'contact_form', ratelimit.client_ip(request),
+        settings.CONTACT_RATE_LIMIT, settings.CONTACT_RATE_WINDOW,
+    )
+
+
+def _reject(request):
+    """Return the response for a POST that should be rejected, or None."""
+    if request.POST.get(HONEYPOT_FIELD):
+        reason = 'honeypot'
+        response = HttpResponse(REJECTED_BODY, status=400)
+    elif not check_rate_limit(request):
+        reason = 'rate_limited'
+        response = HttpResponse(RATE_LIMITED_BODY, status=429)
+        response['Retry-After'] = str(settings.CONTACT_RATE_WINDOW)
+    else:
+        return None
+
+    with _rejections_lock:
+        rejections[reason] += 1
+    return response
+
+
+def _guarded(request):
+    return request.method == 'POST' and request.path_info in form_paths()
+
+
+@sync_and_async_middleware
+def form_guard_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if _guarded(request):
+                response = await sync_to_async(_reject)(request)
+                if response is not None:
+                    return response
+            return await get_response(request)
+    else:
+        def middleware(request):
+            if _guarded(request):
+                response = _reject(request)
+                if response is not None:
+                    return response
+            return get_response(request)
+    return middleware
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(max_length=255, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'worker metrics',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+class RateLimitBucket(models.Model):
+    """One fixed-window counter of core.ratelimit's database store."""
+    key = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return f'{self.key}: {self.count}'
+
+
+class OutboxMessage(models.Model):
+    """An email waiting to be sent by `manage.py send_outbox` (see core.outbox)."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (DEAD, 'Dead')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.subject} ({self.status})'
+
+
+class WorkerMetrics(models.Model):
+    """The metrics one worker process has recorded so far (see core.metrics)."""
+    worker = models.CharField(max_length=255, unique=True)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'worker metrics'
+
+    def __str__(self):
+        return self.worker
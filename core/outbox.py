@@ -0,0 +1,124 @@
+"""
+Durable outbox for the emails sent by the contact forms.
+
+Views call enqueue(), which only inserts an OutboxMessage row, so a slow or
+unreachable mail server never delays a form submission. `manage.py
+send_outbox` delivers pending messages in batches over one SMTP connection
+(get_connection()), reusing it for the whole batch:
+
+- A batch is claimed by pushing its next_attempt_at OUTBOX_LEASE seconds
+  ahead, under SELECT ... FOR UPDATE SKIP LOCKED where the database supports
+  it, so several workers never send the same message.
+- A failed message is retried after OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+  seconds, and marked dead (kept, with its last error) after
+  OUTBOX_MAX_ATTEMPTS attempts.
+
+django.core.mail is only imported by deliver(), so web workers, which only
+enqueue, never load the email and SMTP modules.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import OutboxMessage
+
+
+def enqueue(subject, body, to, reply_to=None, from_email=None):
+    """Queue an email for delivery; returns the OutboxMessage."""
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        to=list(to),
+        reply_to=list(reply_to or []),
+    )
+
+
+def claim_batch(batch_size):
+    """Lease up to batch_size due messages to this worker and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboxMessage.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            next_attempt_at=now + datetime.timedelta(seconds=settings.OUTBOX_LEASE)
+        )
+    return messages
+
+
+def _record_failure(message, error):
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = OutboxMessage.DEAD
+    else:
+        delay = settings.OUTBOX_RETRY_BACKOFF * 2 ** (message.attempts - 1)
+        message.next_attempt_at = timezone.now() + datetime.timedelta(seconds=delay)
+    message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver(messages):
+    """Send messages over one connection; returns (sent, failed) counts."""
+    from django.core.mail import EmailMessage, get_connection
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for message in messages:
+            _record_failure(message, f'Could not connect: {e}')
+        return 0, len(messages)
+
+    try:
+        for message in messages:
+            email = EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email,
+                to=message.to,
+                reply_to=message.reply_to,
+                connection=connection,
+            )
+            try:
+                with metrics.timing('smtp'):
+                    connection.send_messages([email])
+            except Exception as e:
+                _record_failure(message, str(e))
+                failed += 1
+                # The connection may be unusable now; reopen it for the rest
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+                continue
+
+            message.status = OutboxMessage.SENT
+            message.attempts += 1
+            message.sent_at = timezone.now()
+            message.save(update_fields=['status', 'attempts', 'sent_at'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def drain(batch_size=None):
+    """Send due messages batch by batch until none are left; returns (sent, failed)."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    while True:
+        messages = claim_batch(batch_size)
+        if not messages:
+            return sent, failed
+        batch_sent, batch_failed = deliver(messages)
+        sent += batch_sent
+        failed += batch_failed
@@ -0,0 +1,68 @@
+"""
+Full-page cache for anonymous GET requests.
+
+`cached_page` stores the rendered HTML of a view in the cache, keyed by the
+request path, the catalog version and the templates and static files of the
+running build, so editing the catalog or deploying invalidates every cached
+page (the shared cache outlives deploys, and old pages would link to static
+files collectstatic has replaced). POSTs, signed-in users and non-200 responses bypass the
+cache.
+
+Pages are stored with a placeholder in place of the CSRF token (see
+core.context_processors.page_cache_csrf); each response gets the visitor's own
+token substituted in, so a cached form is valid for everyone.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from projects.catalog import catalog_version
+
+from .conditional import templates_state
+
+CACHE_KEY_PREFIX = 'page:'
+CSRF_PLACEHOLDER = 'csrf-token-placeholder-9f2b7c1e'
+
+
+def _cache_key(request):
+    parts = [templates_state()[0], getattr(staticfiles_storage, 'manifest_hash', ''), request.path]
+    digest = hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+    return f'{CACHE_KEY_PREFIX}{catalog_version()}:{digest}'
+
+
+def _with_csrf_token(request, content):
+    placeholder = CSRF_PLACEHOLDER.encode()
+    if placeholder in content:
+        content = content.replace(placeholder, get_token(request).encode())
+    return content
+
+
+def cached_page(view):
+    """Cache a view's rendered page for anonymous GET and HEAD requests."""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        key = _cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(_with_csrf_token(request, content), content_type=content_type)
+
+        request.page_cache_miss = True
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+        response.content = _with_csrf_token(request, response.content)
+        return response
+
+    return wrapper
@@ -0,0 +1,124 @@
+"""
+Sliding-window rate limiting shared by every worker.
+
+Hits are counted in fixed windows of `window` seconds, one counter per key and
+window, and the count for the sliding window ending now is estimated from the
+current and previous counters:
+
+    previous * (1 - elapsed / window) + current
+
+so each key needs two integers however many hits it gets. Counters are
+incremented atomically in a store shared by every worker (RATE_LIMIT_STORE):
+
+- 'database': RateLimitBucket rows updated with UPDATE ... count + 1 and read
+  back in the same transaction, shared across workers and nodes. Expired rows are swept when a new one is created.
+- 'cache': the default cache's add/incr. Atomic and shared with Redis or
+  Memcached; with the default LocMem cache it only limits within a process,
+  which is what tests and local development want.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import RateLimitBucket
+
+KEY_PREFIX = 'ratelimit:'
+
+
+class CacheStore:
+    def incr(self, key, timeout):
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            cache.add(key, 1, timeout)
+            return 1
+
+    def decr(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+
+    def get(self, key):
+        return cache.get(key, 0)
+
+
+class DatabaseStore:
+    def incr(self, key, timeout):
+        # The UPDATE locks the row until the transaction ends, so the count
+        # read back is this increment's and not a concurrent one's
+        with transaction.atomic():
+            if RateLimitBucket.objects.filter(key=key).update(count=F('count') + 1):
+                return RateLimitBucket.objects.values_list('count', flat=True).get(key=key)
+
+        now = time.time()
+        try:
+            with transaction.atomic():
+                RateLimitBucket.objects.create(key=key, count=1, expires_at=now + timeout)
+        except IntegrityError:
+            # Another worker created it first
+            return self.incr(key, timeout)
+        RateLimitBucket.objects.filter(expires_at__lt=now).delete()
+        return 1
+
+    def decr(self, key):
+        RateLimitBucket.objects.filter(key=key, count__gt=0).update(count=F('count') - 1)
+
+    def get(self, key):
+        return RateLimitBucket.objects.filter(key=key).values_list('count', flat=True).first() or 0
+
+
+STORES = {
+    'cache': CacheStore(),
+    'database': DatabaseStore(),
+}
+
+
+def get_store():
+    return STORES[settings.RATE_LIMIT_STORE]
+
+
+def client_ip(request):
+    """Return the client's IP address.
+
+    Behind a proxy REMOTE_ADDR is the proxy's address, so when
+    RATE_LIMIT_IP_HEADER names a header the proxy sets (e.g.
+    HTTP_X_FORWARDED_FOR), the address RATE_LIMIT_TRUSTED_PROXIES hops from
+    the right of it is used instead. Entries further left are set by the
+    client and can't be trusted.
+    """
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header and header in request.META:
+        addresses = [address.strip() for address in request.META[header].split(',')]
+        index = max(len(addresses) - settings.RATE_LIMIT_TRUSTED_PROXIES, 0)
+        if addresses[index]:
+            return addresses[index]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def allow(scope, ident, limit, window, now=None):
+    """Count a hit for ident and return True if it is within limit per window.
+
+    Rejected hits are not counted, so a client that keeps retrying is let
+    through again once its earlier hits age out of the window.
+    """
+    now = time.time() if now is None else now
+    current_start = int(now // window) * window
+    key = f'{KEY_PREFIX}{scope}:{ident}:'
+    store = get_store()
+
+    # Counters live for two windows, so the previous one is still there
+    current_key = key + str(current_start)
+    current = store.incr(current_key, 2 * window)
+    previous = store.get(key + str(current_start - window))
+
+    estimate = previous * (1 - (now - current_start) / window) + current
+    if estimate > limit:
+        store.decr(current_key)
+        return False
+    return True
@@ -0,0 +1,346 @@
+"""
+Site search over projects, repositories (with their READMEs) and blog posts.
+
+`manage.py build_search` (run after build_docs and build_blog) tokenizes every
+document once and writes an inverted index to SEARCH_ROOT:
+
+- postings-<hash>.bin: three packed arrays of the same length, the document
+  numbers, term frequencies and first character offsets of every posting,
+  grouped by term
+- index.json: the documents (kind, title, url, length, plain text for
+  snippets), each term's slice of the arrays, and the versions of the catalog,
+  blog and docs it was built from
+
+search() only touches the postings of the query terms, scoring documents with
+BM25, and cuts the snippet from a window of text around the first match, so a
+query never scans document text. Title matches count TITLE_WEIGHT times.
+
+When the catalog, blog or docs have changed since the index was written (e.g.
+after an edit in the admin), searches keep using it while a background thread
+rebuilds it in memory, so no search waits on a rebuild. Only without a built
+index, as in development, is one built on the first search.
+"""
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+INDEX_NAME = 'index.json'
+
+TOKEN_RE = re.compile(r'\w+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was were will with'.split()
+)
+TITLE_WEIGHT = 3
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SNIPPET_BEFORE = 60
+SNIPPET_LENGTH = 200
+
+_index = {'key': None, 'index': None, 'rebuilding': False}
+_docs_version = {'manifest': None, 'version': None}
+_index_lock = threading.Lock()
+
+
+def normalize(word):
+    """Return the indexed form of a word: lowercase, simple plurals folded."""
+    word = word.lower()
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Yield (term, character offset) for every indexed word in text."""
+    for match in TOKEN_RE.finditer(text):
+        term = normalize(match.group())
+        if term not in STOPWORDS:
+            yield term, match.start()
+
+
+def _plain(html):
+    return ' '.join(strip_tags(html).split())
+
+
+# Documents
+
+def site_documents():
+    """Return every searchable document as a dict with kind, title, url and text."""
+    from blog.content import get_blog
+    from projects import catalog, docs
+
+    documents = []
+    for project in catalog.get_projects().values():
+        documents.append({
+            'kind': 'Project',
+            'title': project.name,
+            'url': project.url,
+            'text': _plain(' '.join([
+                project.description,
+                project.overview,
+                *(f'{repo.name}: {repo.description}.' for repo in project.repositories),
+            ])),
+        })
+        for repo in project.repositories:
+            readme = docs.get_prerendered_html(repo.readme_url) if repo.readme_url else None
+            documents.append({
+                'kind': project.name,
+                'title': repo.name,
+                'url': repo.url,
+                'text': _plain(' '.join([
+                    repo.description + '.',
+                    'Tech stack: ' + ', '.join(tech.name for tech in repo.tech_stack) + '.',
+                    *(feature + '.' for feature in repo.features),
+                    readme or '',
+                ])),
+            })
+
+    blog = get_blog()
+    for post in blog.posts:
+        documents.append({
+            'kind': 'Blog',
+            'title': post.title,
+            'url': post.url,
+            'text': _plain(' '.join([
+                post.summary,
+                'Tags: ' + ', '.join(tag.name for tag in post.tags) + '.',
+                blog.html(post),
+            ])),
+        })
+    return documents
+
+
+def sources():
+    """Return the versions of everything the index is built from."""
+    from blog.content import get_blog
+    from projects import catalog, docs
+
+    manifest = docs.load_manifest()
+    # load_manifest() returns the same dict until the manifest is rebuilt
+    if manifest is not _docs_version['manifest']:
+        encoded = json.dumps(manifest, sort_keys=True).encode()
+        _docs_version.update(manifest=manifest, version=hashlib.sha256(encoded).hexdigest()[:16])
+    return {
+        'catalog': catalog.catalog_version(),
+        'blog': get_blog().version,
+        'docs': _docs_version['version'],
+    }
+
+
+# Building
+
+def build(documents, built_from=None):
+    """Index documents; returns (index data, postings blob bytes)."""
+    postings = {}
+    for number, document in enumerate(documents):
+        title_terms = Counter(term for term, _ in tokenize(document['title']))
+        body = {}
+        for term, offset in tokenize(document['text']):
+            count, first = body.get(term, (0, offset))
+            body[term] = (count + 1, first)
+        for term in title_terms.keys() | body.keys():
+            count, first = body.get(term, (0, 0))
+            postings.setdefault(term, []).append((number, count + TITLE_WEIGHT * title_terms[term], first))
+        document['length'] = sum(count for count, _ in body.values()) + TITLE_WEIGHT * sum(title_terms.values())
+
+    doc_numbers, frequencies, offsets = array('I'), array('I'), array('I')
+    terms = {}
+    for term in sorted(postings):
+        terms[term] = [len(doc_numbers), len(postings[term])]
+        for number, frequency, offset in postings[term]:
+            doc_numbers.append(number)
+            frequencies.append(frequency)
+            offsets.append(offset)
+
+    blob = doc_numbers.tobytes() + frequencies.tobytes() + offsets.tobytes()
+    data = {
+        'documents': documents,
+        'terms': terms,
+        'postings': len(doc_numbers),
+        'sources': built_from or {},
+    }
+    return data, blob
+
+
+def write_index(data, blob, root=None):
+    """Write the postings and then atomically replace the index in root (SEARCH_ROOT by default)."""
+    root = root or settings.SEARCH_ROOT
+    os.makedirs(root, exist_ok=True)
+    name = f'postings-{hashlib.sha256(blob).hexdigest()[:16]}.bin'
+    path = os.path.join(root, name)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'wb') as postings_file:
+            postings_file.write(blob)
+        os.replace(path + '.tmp', path)
+
+    index_path = os.path.join(root, INDEX_NAME)
+    with open(index_path + '.tmp', 'w') as index_file:
+        json.dump(dict(data, file=name), index_file, separators=(',', ':'), sort_keys=True)
+    os.replace(index_path + '.tmp', index_path)
+
+    for other in os.listdir(root):
+        if other.startswith('postings-') and other != name:
+            os.remove(os.path.join(root, other))
+    return name
+
+
+# Searching
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    kind: str
+    title: str
+    url: str
+    snippet: str
+    score: float
+
+
+class SearchIndex:
+    """A loaded index: the postings arrays and per-document BM25 length norms."""
+
+    def __init__(self, data, blob):
+        self.documents = data['documents']
+        self.terms = data['terms']
+        self.sources = data['sources']
+        count = data['postings']
+        arrays = []
+        for position in range(3):
+            values = array('I')
+            values.frombytes(blob[position * count * values.itemsize:(position + 1) * count * values.itemsize])
+            arrays.append(values)
+        self.doc_numbers, self.frequencies, self.offsets = arrays
+
+        total = len(self.documents)
+        average = sum(document['length'] for document in self.documents) / total if total else 1
+        self.norms = [K1 * (1 - B + B * document['length'] / (average or 1)) for document in self.documents]
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, (_, frequency) in self.terms.items()
+        }
+
+    def search(self, query, limit=20):
+        """Return the best SearchResults for query, best first."""
+        query_terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        scores = {}
+        first_match = {}
+        # Rarest terms first, so a document's snippet is cut around its most telling match
+        for term in sorted((term for term in query_terms if term in self.terms), key=self.idf.get, reverse=True):
+            start, count = self.terms[term]
+            idf = self.idf[term]
+            for posting in range(start, start + count):
+                number = self.doc_numbers[posting]
+                frequency = self.frequencies[posting]
+                scores[number] = scores.get(number, 0.0) + idf * frequency * (K1 + 1) / (frequency + self.norms[number])
+                first_match.setdefault(number, self.offsets[posting])
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [
+            SearchResult(
+                kind=self.documents[number]['kind'],
+                title=self.documents[number]['title'],
+                url=self.documents[number]['url'],
+                snippet=snippet(self.documents[number]['text'], first_match[number], query_terms),
+                score=score,
+            )
+            for number, score in best
+        ]
+
+
+def snippet(text, offset, query_terms):
+    """Return HTML for the text around offset, with query terms in <mark>."""
+    start = max(0, offset - SNIPPET_BEFORE)
+    if start:
+        start = text.find(' ', start) + 1 or start
+    end = min(len(text), start + SNIPPET_LENGTH)
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        if space > start:
+            end = space
+    window = text[start:end]
+
+    terms = set(query_terms)
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(window):
+        if normalize(match.group()) in terms:
+            parts.append(escape(window[position:match.start()]))
+            parts.append(f'<mark>{escape(match.group())}</mark>')
+            position = match.end()
+    parts.append(escape(window[position:]))
+    return mark_safe(('…' if start else '') + ''.join(parts) + ('…' if end < len(text) else ''))
+
+
+def _rebuild(current):
+    try:
+        index = SearchIndex(*build(site_documents(), current))
+        with _index_lock:
+            _index['index'] = index
+    finally:
+        connection.close()
+        with _index_lock:
+            _index['rebuilding'] = False
+
+
+def _rebuild_in_background(current):
+    with _index_lock:
+        if _index['rebuilding']:
+            return
+        _index['rebuilding'] = True
+    threading.Thread(target=_rebuild, args=(current,), daemon=True).start()
+
+
+def load_index():
+    """Return the SearchIndex, loading it again if index.json changed.
+
+    Never starts a background rebuild, so the gunicorn master can call it
+    before forking (core.startup.warm); builds in memory only when there is
+    no index at all.
+    """
+    index_path = os.path.join(settings.SEARCH_ROOT, INDEX_NAME)
+    try:
+        key = os.stat(index_path).st_mtime_ns
+    except OSError:
+        key = None
+
+    with _index_lock:
+        if _index['index'] is None or key != _index['key']:
+            if key is not None:
+                with open(index_path) as index_file:
+                    data = json.load(index_file)
+                with open(os.path.join(settings.SEARCH_ROOT, data['file']), 'rb') as postings_file:
+                    index = SearchIndex(data, postings_file.read())
+            else:
+                index = SearchIndex(*build(site_documents(), sources()))
+            _index.update(key=key, index=index)
+        return _index['index']
+
+
+def get_index():
+    """Return the SearchIndex, rebuilding it in the background if its sources changed."""
+    index = load_index()
+    current = sources()
+    if index.sources != current:
+        _rebuild_in_background(current)
+    return index
+
+
+def search(query, limit=20):
+    """Return the best SearchResults for query across the site."""
+    with metrics.timing('search'):
+        return get_index().search(query, limit)
@@ -0,0 +1,108 @@
+"""
+Single-flight request coalescing.
+
+`do(key, fn)` makes sure concurrent callers asking for the same key share one
+call of fn instead of each running it:
+
+- Within a process, the first thread runs fn and the others wait on its
+  result (or exception).
+- Across processes, the running thread also holds a lock in the shared cache
+  (cache.add) and publishes its result there for a few seconds, so workers
+  in other processes poll for that result instead of calling fn themselves.
+  The lock lives as long as the slowest upstream fetch can take (every
+  attempt timing out), so a second caller never starts while the first is
+  still running.
+
+When the leader overruns SINGLEFLIGHT_WAIT seconds, one waiting caller takes
+over as leader: it takes the lock again once it is released or has expired
+(the leader's process died) and runs fn, while the others keep waiting for it.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import upstream
+
+LOCK_PREFIX = 'singleflight:lock:'
+RESULT_PREFIX = 'singleflight:result:'
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def _wait_for_other_process(key, deadline):
+    """Poll for the result another process is producing; returns (found, result)."""
+    while True:
+        # The lock is checked first: the result is published before it is released
+        locked = cache.get(LOCK_PREFIX + key) is not None
+        published = cache.get(RESULT_PREFIX + key)
+        if published is not None:
+            return True, published[0]
+        if not locked or time.monotonic() >= deadline:
+            # Released without a result (the call raised), or still running
+            return False, None
+        time.sleep(POLL_INTERVAL)
+
+
+def _lock_timeout(wait):
+    return int(max(wait, upstream.max_duration())) + 1
+
+
+def _run(key, fn, wait):
+    while not cache.add(LOCK_PREFIX + key, 1, _lock_timeout(wait)):
+        found, result = _wait_for_other_process(key, time.monotonic() + wait)
+        if found:
+            return result
+        # Released without a result, or still held: try to take it over
+
+    try:
+        result = fn()
+        cache.set(RESULT_PREFIX + key, (result,), int(wait) + 1)
+        return result
+    finally:
+        cache.delete(LOCK_PREFIX + key)
+
+
+def do(key, fn, wait=None):
+    """Return fn(), sharing one in-flight call among concurrent callers of key."""
+    wait = settings.SINGLEFLIGHT_WAIT if wait is None else wait
+
+    while True:
+        with _calls_lock:
+            call = _calls.get(key)
+            if call is None:
+                call = _calls[key] = _Call()
+                break
+
+        if call.done.wait(wait):
+            if call.error is not None:
+                raise call.error
+            return call.result
+        # The leader overran: the first follower here takes over, the others
+        # go back to waiting on it
+        with _calls_lock:
+            if _calls.get(key) is call:
+                del _calls[key]
+
+    try:
+        call.result = _run(key, fn, wait)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            if _calls.get(key) is call:
+                del _calls[key]
+        call.done.set()
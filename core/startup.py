@@ -0,0 +1,68 @@
+"""
+Worker start-up: what gunicorn loads before forking, and what each worker
+resets after.
+
+gunicorn.conf.py preloads the application in the master and calls warm()
+before forking the workers, so they start with the modules imported, the
+catalog loaded and the templates compiled, sharing that memory copy-on-write.
+after_fork() then drops what must not be shared between processes: database
+and cache connections and the upstream HTTP pools.
+
+`manage.py profile_startup` shows where start-up time goes.
+"""
+import gc
+import importlib
+
+from django.core.cache import caches
+from django.db import connections
+from django.template import loader
+
+# Imported on first use by the code that needs them, so management commands
+# and the development server don't pay for them; preloaded for the workers
+LAZY_MODULES = [
+    'requests',
+    'django.core.mail',
+]
+
+
+def warm():
+    """Load everything the first requests would otherwise load, then close connections."""
+    from blog import content
+    from projects import catalog, docs
+
+    from . import conditional, critical_css, images, search
+
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+    catalog.get_catalog()
+    conditional.templates_state()
+    docs.load_manifest()
+    content.get_blog()
+    # Load only: a rebuild thread started here wouldn't survive the fork
+    search.load_index()
+    images.load_manifest()
+    for template_name in critical_css.page_templates():
+        loader.get_template(template_name)
+        try:
+            critical_css.get_critical_css(template_name)
+        except (OSError, TypeError):
+            pass  # No stylesheet; pages link it normally
+
+    # Connections can't be shared with the workers
+    connections.close_all()
+    caches.close_all()
+
+    # Keep the garbage collector from touching (and so copying) everything
+    # loaded so far in each worker
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork():
+    """Reset the per-process state inherited from the master."""
+    from . import upstream
+
+    connections.close_all()
+    caches.close_all()
+    upstream.reset_pools()
@@ -0,0 +1,56 @@
+"""
+Streamed page responses for content that is slow to produce.
+
+stream_page() renders the template straight away with a placeholder for the
+slow part of the context, sends everything before the placeholder (head,
+inline CSS, header, page metadata) as the first chunk, then the slow HTML
+once it is ready, then the rest of the page. The browser paints the page
+shell while e.g. GitHub is still answering, so time to first byte and first
+paint no longer depend on it.
+
+Streaming needs the ASGI server: under WSGI the response can't outlive the
+view's event loop, so streaming_supported() is False and views render the
+whole page instead.
+"""
+import asyncio
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+SLOT = '<!-- streamed content -->'
+ERROR_HTML = '<p>Error loading documentation. Please try again later.</p>'
+
+
+def streaming_supported(request):
+    return isinstance(request, ASGIRequest)
+
+
+def stream_page(request, template_name, context, name, content):
+    """Return a response streaming the page, with context[name] sent last.
+
+    content is an awaitable producing the HTML for context[name]. It starts
+    running now and is cancelled if the client goes away; if it fails, the
+    page is finished with ERROR_HTML in its place.
+    """
+    task = asyncio.ensure_future(content)
+    with metrics.timing('render'):
+        page = render_to_string(template_name, dict(context, **{name: mark_safe(SLOT)}), request)
+    head, _, tail = page.partition(SLOT)
+
+    async def chunks():
+        try:
+            yield head
+            try:
+                html = await task
+            except Exception:
+                html = ERROR_HTML
+            yield html
+            yield tail
+        finally:
+            task.cancel()
+
+    return StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
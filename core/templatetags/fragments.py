@@ -0,0 +1,35 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        vary_on = [variable.resolve(context) for variable in self.vary_on]
+        return mark_safe(fragments.get_or_render(name, vary_on, lambda: self.nodelist.render(context)))
+
+
+@register.tag
+def fragment(parser, token):
+    """Cache the enclosed markup per catalog version (see core.fragments).
+
+        {% fragment 'repo_card' project.slug repo.slug %}...{% endfragment %}
+
+    The arguments after the name must identify everything the markup depends
+    on other than the catalog, templates and static files.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
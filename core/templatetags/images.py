@@ -0,0 +1,63 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from core import images
+
+register = template.Library()
+
+
+def _static_name(src):
+    """Turn '/static/assets/x.png' or 'assets/x.png' into 'assets/x.png'."""
+    prefix = '/' + settings.STATIC_URL.lstrip('/')
+    if src.startswith(prefix):
+        return src[len(prefix):]
+    return src.lstrip('/')
+
+
+@register.simple_tag
+def responsive_image(src, alt, sizes='100vw', css_class='', loading='lazy', fetchpriority='',
+                     svg='', picture_class='', element_id=''):
+    """Render a <picture> with AVIF/WebP srcsets built by `manage.py build_images`.
+
+    The <img> gets the original's width and height so the browser can reserve
+    its space before it loads. Images without variants render as a plain
+    <img>. Pass loading='eager' and fetchpriority='high' for the largest image
+    above the fold.
+
+    svg names a vector version of the image, offered ahead of the raster
+    variants (or used alone when src is empty); only pass one that really is
+    vector, as an SVG wrapping a bitmap is larger than the variants.
+    """
+    extra = format_html(' class="{}" loading="{}" decoding="async"', css_class, loading)
+    if element_id:
+        extra += format_html(' id="{}"', element_id)
+    if fetchpriority:
+        extra += format_html(' fetchpriority="{}"', fetchpriority)
+    if not src:
+        return format_html('<img src="{}" alt="{}"{}>', static(_static_name(svg)), alt, extra)
+
+    name = _static_name(src)
+    entry = images.load_manifest().get(name)
+    if entry is None and not svg:
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, extra)
+
+    sources = []
+    if svg:
+        sources.append(format_html('<source type="image/svg+xml" srcset="{}">', static(_static_name(svg))))
+    if entry is not None:
+        sources.append(format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            (
+                (mime_type, ', '.join(f'{static(variant)} {width}w' for variant, width in variants), sizes)
+                for mime_type, variants in entry['sources'].items()
+            ),
+        ))
+        extra = format_html(' width="{}" height="{}"', entry['width'], entry['height']) + extra
+    picture = format_html('<picture class="{}">', picture_class) if picture_class else mark_safe('<picture>')
+    return format_html(
+        '{}{}<img src="{}" alt="{}"{}></picture>',
+        picture, mark_safe(''.join(sources)), static(name), alt, extra,
+    )
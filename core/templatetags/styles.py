@@ -0,0 +1,37 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from core import critical_css
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def critical_css_link(context):
+    """Inline the page's critical CSS and load the full stylesheet without blocking.
+
+    The rules the page template uses are inlined in a <style>, and output.css
+    is preloaded and applied once it arrives (or linked normally without
+    JavaScript). Falls back to a plain stylesheet link when the critical CSS
+    can't be computed.
+    """
+    href = static(critical_css.STYLESHEET)
+    template_name = getattr(context.template, 'name', None)
+    try:
+        css = critical_css.get_critical_css(template_name) if template_name else ''
+    except (OSError, TypeError, template.TemplateDoesNotExist):
+        css = ''
+    if not css:
+        return format_html('<link rel="stylesheet" href="{}">', href)
+
+    return format_html(
+        '<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '    <noscript><link rel="stylesheet" href="{}"></noscript>',
+        # The CSS comes from our own stylesheet; only guard against closing the element
+        mark_safe(css.replace('</', '<\\/')),
+        href,
+        href,
+    )
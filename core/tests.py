@@ -0,0 +1,377 @@
+import datetime
+import io
+import smtplib
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core import mail
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from projects import catalog
+from projects.models import Project
+
+from . import conditional, export, metrics, outbox, pagecache, ratelimit, search, singleflight, upstream
+from .models import OutboxMessage, RateLimitBucket
+
+# A window-aligned time, so tests can step to the window boundaries
+START = 1_000_020
+WINDOW = 60
+LIMIT = 3
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'core-tests',
+    },
+}
+
+
+class RateLimitTests:
+    """The sliding window, run against each store by the subclasses below."""
+
+    def setUp(self):
+        cache.clear()
+
+    def allow(self, now, ident='client'):
+        return ratelimit.allow('test', ident, LIMIT, WINDOW, now=now)
+
+    def test_limit_within_window(self):
+        self.assertEqual([self.allow(START + second) for second in range(LIMIT + 1)], [True, True, True, False])
+        self.assertTrue(self.allow(START + LIMIT, ident='other'))
+
+    def test_previous_window_counts_while_it_slides_out(self):
+        for _ in range(LIMIT):
+            self.assertTrue(self.allow(START))
+        # At the boundary the whole previous window still counts...
+        self.assertFalse(self.allow(START + WINDOW))
+        # ...halfway through the next it counts half: 1.5 + 1
+        self.assertTrue(self.allow(START + WINDOW + WINDOW // 2))
+        # 1.5 + 2
+        self.assertFalse(self.allow(START + WINDOW + WINDOW // 2))
+
+    def test_older_windows_do_not_count(self):
+        for _ in range(LIMIT):
+            self.assertTrue(self.allow(START))
+        for _ in range(LIMIT):
+            self.assertTrue(self.allow(START + 2 * WINDOW))
+
+    def test_rejected_hits_are_not_counted(self):
+        for _ in range(LIMIT):
+            self.assertTrue(self.allow(START))
+        for _ in range(10):
+            self.assertFalse(self.allow(START + 1))
+        key = f'{ratelimit.KEY_PREFIX}test:client:{START}'
+        self.assertEqual(ratelimit.get_store().get(key), LIMIT)
+        # Only the allowed hits carry over: 3 * 0.5 + 1
+        self.assertTrue(self.allow(START + WINDOW + WINDOW // 2))
+
+
+@override_settings(RATE_LIMIT_STORE='cache', CACHES=TEST_CACHES)
+class CacheStoreTests(RateLimitTests, TestCase):
+    pass
+
+
+@override_settings(RATE_LIMIT_STORE='database')
+class DatabaseStoreTests(RateLimitTests, TestCase):
+
+    def test_counts_are_rows(self):
+        self.allow(START)
+        self.allow(START + 1)
+        bucket = RateLimitBucket.objects.get()
+        self.assertEqual(bucket.key, f'{ratelimit.KEY_PREFIX}test:client:{START}')
+        self.assertEqual(bucket.count, 2)
+
+    def test_expired_rows_are_swept(self):
+        RateLimitBucket.objects.create(key='ratelimit:test:gone:0', count=5, expires_at=0)
+        # Only creating a row sweeps
+        self.allow(START)
+        self.assertEqual(RateLimitBucket.objects.count(), 1)
+        self.assertFalse(RateLimitBucket.objects.filter(key='ratelimit:test:gone:0').exists())
+
+    def test_decr_does_not_go_below_zero(self):
+        store = ratelimit.get_store()
+        store.incr('ratelimit:test:key', WINDOW)
+        store.decr('ratelimit:test:key')
+        store.decr('ratelimit:test:key')
+        self.assertEqual(store.get('ratelimit:test:key'), 0)
+
+
+class ClientIPTests(TestCase):
+    """client_ip only trusts the proxy hops it is told about."""
+
+    def request(self, forwarded=None):
+        extra = {'REMOTE_ADDR': '10.0.0.1'}
+        if forwarded is not None:
+            extra['HTTP_X_FORWARDED_FOR'] = forwarded
+        return RequestFactory().get('/', **extra)
+
+    def test_remote_addr_without_header(self):
+        self.assertEqual(ratelimit.client_ip(self.request('203.0.113.5')), '10.0.0.1')
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_one_proxy(self):
+        self.assertEqual(ratelimit.client_ip(self.request('203.0.113.5')), '203.0.113.5')
+        # Entries the client sent itself are ignored
+        self.assertEqual(ratelimit.client_ip(self.request('198.51.100.9, 203.0.113.5')), '203.0.113.5')
+        # A request that didn't come through the proxy
+        self.assertEqual(ratelimit.client_ip(self.request()), '10.0.0.1')
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=2)
+    def test_two_proxies(self):
+        self.assertEqual(
+            ratelimit.client_ip(self.request('198.51.100.9, 203.0.113.5, 192.0.2.7')), '203.0.113.5',
+        )
+        # Fewer entries than proxies: the leftmost
+        self.assertEqual(ratelimit.client_ip(self.request('203.0.113.5')), '203.0.113.5')
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_empty_entry_falls_back_to_remote_addr(self):
+        self.assertEqual(ratelimit.client_ip(self.request('203.0.113.5, ')), '10.0.0.1')
+
+
+class FailingBackend(BaseEmailBackend):
+    """An email backend whose server refuses every message."""
+
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPRecipientsRefused({'paul@example.com': (550, b'Mailbox unavailable')})
+
+
+@override_settings(OUTBOX_RETRY_BACKOFF=60, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+
+    def enqueue(self):
+        return outbox.enqueue('Subject', 'Body', ['paul@example.com'], reply_to=['visitor@example.com'])
+
+    def make_due(self):
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_queued_message(self):
+        self.enqueue()
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].reply_to, ['visitor@example.com'])
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.SENT)
+        self.assertEqual(message.attempts, 1)
+        # Sent messages are never sent again
+        self.assertEqual(outbox.drain(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claimed_message_is_not_sent_twice(self):
+        self.enqueue()
+        claimed = outbox.claim_batch(10)
+        self.assertEqual(len(claimed), 1)
+        # Another worker polling while the first one sends finds nothing due
+        self.assertEqual(outbox.claim_batch(10), [])
+        self.assertEqual(outbox.drain(), (0, 0))
+        self.assertEqual(outbox.deliver(claimed), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_BACKEND='core.tests.FailingBackend')
+    def test_failures_back_off_exponentially(self):
+        self.enqueue()
+        for attempt, delay in [(1, 60), (2, 120)]:
+            started = timezone.now()
+            self.assertEqual(outbox.drain(), (0, 1))
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.status, OutboxMessage.PENDING)
+            self.assertEqual(message.attempts, attempt)
+            self.assertIn('Mailbox unavailable', message.last_error)
+            retry_in = message.next_attempt_at - started
+            self.assertGreaterEqual(retry_in, datetime.timedelta(seconds=delay))
+            self.assertLess(retry_in, datetime.timedelta(seconds=delay + 5))
+            # Not retried before then
+            self.assertEqual(outbox.drain(), (0, 0))
+            self.make_due()
+
+    @override_settings(EMAIL_BACKEND='core.tests.FailingBackend')
+    def test_dead_after_max_attempts(self):
+        self.enqueue()
+        for _ in range(3):
+            self.assertEqual(outbox.drain(), (0, 1))
+            self.make_due()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.DEAD)
+        self.assertEqual(message.attempts, 3)
+        self.assertTrue(message.last_error)
+        # Dead messages are kept but not retried
+        self.assertEqual(outbox.drain(), (0, 0))
+
+
+class SearchIndexTests(TransactionTestCase):
+    """A stale index keeps being served while it is rebuilt in the background.
+
+    A TransactionTestCase, as the rebuild reads the catalog in its own thread.
+    """
+
+    def setUp(self):
+        search_root = tempfile.TemporaryDirectory()
+        self.addCleanup(search_root.cleanup)
+        settings_override = override_settings(SEARCH_ROOT=search_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        search._index.update(key=None, index=None)
+        self.addCleanup(search._index.update, key=None, index=None)
+
+    def test_stale_index_is_served_while_rebuilt(self):
+        documents = [{'kind': 'Blog', 'title': 'Stale post', 'url': '/blog/stale/', 'text': 'Written before an edit.'}]
+        search.write_index(*search.build(documents, {'catalog': 'old'}))
+
+        self.assertEqual([result.title for result in search.search('stale')], ['Stale post'])
+
+        deadline = time.monotonic() + 5
+        while search.get_index().sources != search.sources():
+            self.assertLess(time.monotonic(), deadline, 'the index was not rebuilt')
+            time.sleep(0.01)
+        self.assertEqual(search.search('stale'), [])
+
+    def test_load_index_does_not_rebuild(self):
+        documents = [{'kind': 'Blog', 'title': 'Stale post', 'url': '/blog/stale/', 'text': 'Written before an edit.'}]
+        search.write_index(*search.build(documents, {'catalog': 'old'}))
+        # As core.startup.warm() does in the gunicorn master before forking
+        self.assertEqual(search.load_index().sources, {'catalog': 'old'})
+        self.assertFalse(search._index['rebuilding'])
+
+
+@override_settings(CATALOG_CHECK_INTERVAL=0)
+class ExportedSiteTests(TestCase):
+    """Exported pages are served until the catalog they were exported from changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('load_catalog', stdout=io.StringIO())
+
+    def setUp(self):
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        catalog.invalidate()
+        export.write_page(export_root.name, '/projects/', b'<html><body>Exported</body></html>')
+        export.write_manifest(export_root.name, {
+            'static': export.static_version(),
+            'catalog': catalog.catalog_version(),
+            'pages': {},
+        })
+        settings_override = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=TEST_CACHES,
+            EXPORT_ROOT=export_root.name,
+            WHITENOISE_ROOT=export_root.name,
+            WHITENOISE_INDEX_FILE=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def edit_catalog(self):
+        project = Project.objects.get(slug='temphist')
+        project.name = 'TempHist 2'
+        project.save()
+
+    def test_exported_page_until_catalog_changes(self):
+        self.assertEqual(b''.join(self.client.get('/projects/').streaming_content), b'<html><body>Exported</body></html>')
+        self.edit_catalog()
+        response = self.client.get('/projects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'TempHist 2')
+
+    async def test_async_requests(self):
+        self.assertTrue(export.exported_site_middleware.async_capable)
+        response = await self.async_client.get('/projects/')
+        # Sent without Django iterating a sync file in a thread
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), b'<html><body>Exported</body></html>')
+        self.assertEqual(response['Content-Type'], 'text/html; charset="utf-8"')
+
+        response = await self.async_client.head('/projects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+        response = await self.async_client.get('/projects/', headers={'Range': 'bytes=6-11'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), b'<body>')
+
+    def test_posts_go_to_django(self):
+        response = self.client.post('/projects/')
+        self.assertNotEqual(response.status_code, 405)
+
+
+class PageCacheKeyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('load_catalog', stdout=io.StringIO())
+
+    def test_key_changes_with_static_files(self):
+        request = RequestFactory().get('/projects/')
+        key = pagecache._cache_key(request)
+        self.assertEqual(pagecache._cache_key(request), key)
+        self.assertNotEqual(pagecache._cache_key(RequestFactory().get('/contact/')), key)
+        # A deploy with new static files gets new keys in the shared cache
+        with mock.patch.object(staticfiles_storage, 'manifest_hash', 'new-build', create=True):
+            self.assertNotEqual(pagecache._cache_key(request), key)
+
+    def test_etag_changes_with_static_files(self):
+        etag = conditional.page_etag('project_list', 'catalog')
+        with mock.patch.object(staticfiles_storage, 'manifest_hash', 'new-build', create=True):
+            self.assertNotEqual(conditional.page_etag('project_list', 'catalog'), etag)
+
+
+class MetricsTests(SimpleTestCase):
+
+    def test_numbers_keep_full_precision(self):
+        self.assertEqual(metrics._number(1234567.0), '1234567')
+        self.assertEqual(metrics._number(2 ** 53), '9007199254740992')
+        self.assertEqual(metrics._number(1234567.125), '1234567.125')
+        self.assertEqual(metrics._number(0.1), '0.1')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def slow(self, seconds):
+        def fn():
+            with self.calls_lock:
+                self.calls += 1
+            time.sleep(seconds)
+            return 'result'
+        return fn
+
+    def test_followers_wait_for_an_overrunning_leader(self):
+        results = []
+        fn = self.slow(0.3)
+
+        def call():
+            results.append(singleflight.do('key', fn, wait=0.05))
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Followers that gave up waiting took over one at a time, and found
+        # the leader's lock still held, so nobody called fn a second time
+        self.assertEqual(results, ['result'] * 6)
+        self.assertEqual(self.calls, 1)
+
+    def test_takes_over_an_expired_lock(self):
+        # A leader in another process that died holding the lock
+        cache.add(singleflight.LOCK_PREFIX + 'key', 1, 1)
+        started = time.monotonic()
+        self.assertEqual(singleflight.do('key', self.slow(0), wait=0.1), 'result')
+        self.assertEqual(self.calls, 1)
+        self.assertLess(time.monotonic() - started, 3)
+
+    def test_lock_outlives_a_slow_upstream_fetch(self):
+        self.assertGreater(singleflight._lock_timeout(0.1), upstream.max_duration())
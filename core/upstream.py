@@ -0,0 +1,165 @@
+"""
+Shared HTTP client for upstream services such as raw.githubusercontent.com.
+
+- Each thread reuses a pooled keep-alive requests.Session, so repeat fetches
+  skip the TCP and TLS handshakes.
+- Connection errors and 502/503/504 responses are retried a bounded number of
+  times with jittered exponential backoff. Read timeouts are not retried, as
+  they already cost a full timeout.
+- A per-host circuit breaker opens after UPSTREAM_CIRCUIT_THRESHOLD consecutive
+  failures and fails fast for UPSTREAM_CIRCUIT_RESET seconds before letting a
+  single trial request through.
+- A URL that failed is negatively cached for UPSTREAM_NEGATIVE_TTL seconds in
+  the shared cache, so other workers fail fast on it too.
+- UPSTREAM_OVERRIDE_URL sends every request to another host instead, e.g. the
+  stub server of `manage.py bench`.
+
+requests is imported on first use, as most requests never reach an upstream
+(see core.startup for what gunicorn preloads).
+"""
+import hashlib
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+RETRY_STATUSES = {502, 503, 504}
+NEGATIVE_CACHE_PREFIX = 'upstream_failure:'
+
+_local = threading.local()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """An upstream request failed after retries, or was refused up front."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream host."""
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be attempted now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let one trial request through and re-arm the timer
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def get_session():
+    """Return this thread's pooled requests.Session."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _local.session = session
+    return session
+
+
+def reset_pools():
+    """Drop pooled sessions and breaker state, e.g. after forking a worker."""
+    _local.__dict__.clear()
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def get_breaker(host):
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(
+                settings.UPSTREAM_CIRCUIT_THRESHOLD, settings.UPSTREAM_CIRCUIT_RESET
+            )
+        return breaker
+
+
+def _negative_cache_key(url):
+    return NEGATIVE_CACHE_PREFIX + hashlib.sha1(url.encode()).hexdigest()
+
+
+def max_duration():
+    """Return the longest get() can take: every attempt timing out, plus the backoff between them."""
+    backoff = sum(settings.UPSTREAM_BACKOFF * 2 ** (attempt - 1) * 1.5 for attempt in range(1, settings.UPSTREAM_RETRIES + 1))
+    return (settings.UPSTREAM_RETRIES + 1) * (settings.UPSTREAM_CONNECT_TIMEOUT + settings.UPSTREAM_READ_TIMEOUT) + backoff
+
+
+def get(url, headers=None):
+    """GET url through the shared client.
+
+    Returns the response for any status other than a retryable 5xx. Raises
+    UpstreamError if the host's circuit is open, the URL failed recently, or
+    every attempt failed.
+    """
+    if settings.UPSTREAM_OVERRIDE_URL:
+        parts = urlsplit(url)
+        url = settings.UPSTREAM_OVERRIDE_URL.rstrip('/') + parts.path + (f'?{parts.query}' if parts.query else '')
+
+    host = urlsplit(url).netloc
+    failure = cache.get(_negative_cache_key(url))
+    if failure is not None:
+        metrics.incr('turnpiece_upstream_requests_total', host=host, outcome='cached_failure')
+        raise UpstreamError(f'{failure} (cached failure)')
+
+    breaker = get_breaker(host)
+    if not breaker.allow():
+        metrics.incr('turnpiece_upstream_requests_total', host=host, outcome='circuit_open')
+        raise UpstreamError(f'{host} is unavailable (circuit open)')
+
+    import requests
+
+    timeout = (settings.UPSTREAM_CONNECT_TIMEOUT, settings.UPSTREAM_READ_TIMEOUT)
+    for attempt in range(settings.UPSTREAM_RETRIES + 1):
+        if attempt:
+            metrics.incr('turnpiece_upstream_requests_total', host=host, outcome='retry')
+            delay = settings.UPSTREAM_BACKOFF * 2 ** (attempt - 1)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+        try:
+            response = get_session().get(url, headers=headers, timeout=timeout)
+        except requests.ConnectionError as e:
+            error = f'Could not connect to {host}: {e}'
+            continue
+        except requests.RequestException as e:
+            error = f'Request to {host} failed: {e}'
+            break
+        if response.status_code not in RETRY_STATUSES:
+            breaker.record_success()
+            metrics.incr('turnpiece_upstream_requests_total', host=host, outcome=str(response.status_code))
+            return response
+        error = f'{host} returned {response.status_code}'
+
+    breaker.record_failure()
+    metrics.incr('turnpiece_upstream_requests_total', host=host, outcome='failed')
+    cache.set(_negative_cache_key(url), error, settings.UPSTREAM_NEGATIVE_TTL)
+    raise UpstreamError(error)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import contact_view, home_view, support_view
+from .views import contact_view, csrf_token_view, home_view, metrics_view, search_view, support_view
 
 urlpatterns = [
     path("", home_view, name="home"),
     path("support/", support_view, name="support"),
     path("contact/", contact_view, name="contact"),
+    path("search/", search_view, name="search"),
+    path("metrics", metrics_view, name="metrics"),
+    path("csrf/", csrf_token_view, name="csrf_token"),
 ]
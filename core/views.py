@@ -1,46 +1,31 @@
-from django.shortcuts import render
-from django.core.mail import send_mail
+import hmac
+
 from django.conf import settings
-from django.core.cache import cache
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition
+from . import metrics, outbox, search
+from .conditional import has_csrf_cookie, page_etag, page_last_modified
 from .forms import ContactForm
-from projects.views import PROJECTS_DATA
-import requests
-import re
-import time
+from .metrics import render
+from .pagecache import cached_page
+from .streaming import stream_page, streaming_supported
+from projects.docs import aget_doc_html, doc_digest, get_prerendered_html
+from projects import catalog
+
+TEMPHIST_APP_DESCRIPTION = 'A Flutter application that visualises historical average temperatures by year using horizontal bar charts. It makes use of the TempHist API to fetch temperature data.'
 
 
 def send_contact_email(form_data, subject_prefix, recipient_email):
-    """Helper function to send contact form emails."""
-    send_mail(
-        subject=f"{subject_prefix} from {form_data['name']}",
-        message=f"Name: {form_data['name']}\nEmail: {form_data['email']}\n\nMessage:\n{form_data['message']}",
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[recipient_email],
-        reply_to=[form_data['email']],
-    )
-
-
-def check_rate_limit(request, limit=3, window=300):
-    """Check if user has exceeded rate limit (3 submissions per 5 minutes)."""
-    ip_address = request.META.get('REMOTE_ADDR', 'unknown')
-    cache_key = f"contact_form_rate_limit_{ip_address}"
-    
-    # Get current submissions count
-    submissions = cache.get(cache_key, [])
-    current_time = time.time()
-    
-    # Remove old submissions outside the window
-    submissions = [timestamp for timestamp in submissions if current_time - timestamp < window]
-    
-    # Check if limit exceeded
-    if len(submissions) >= limit:
-        return False
-    
-    # Add current submission
-    submissions.append(current_time)
-    cache.set(cache_key, submissions, window)
-    return True
+    """Helper function to queue contact form emails (sent by manage.py send_outbox)."""
+    with metrics.timing('email'):
+        outbox.enqueue(
+            subject=f"{subject_prefix} from {form_data['name']}",
+            body=f"Name: {form_data['name']}\nEmail: {form_data['email']}\n\nMessage:\n{form_data['message']}",
+            to=[recipient_email],
+            reply_to=[form_data['email']],
+        )
 
 
 def handle_contact_form(request, template_name, success_redirect=None):
@@ -49,20 +34,46 @@ def handle_contact_form(request, template_name, success_redirect=None):
     error_message = None
     
     if request.method == "POST":
-        # Check rate limit first
-        if not check_rate_limit(request):
-            error_message = "Too many submissions. Please wait 5 minutes before trying again."
-            form = ContactForm(request.POST)
-        else:
-            form = ContactForm(request.POST)
-            if form.is_valid():
-                cd = form.cleaned_data
-                return cd, True, ContactForm(), None  # Return form data, submitted status, cleared form, and no error
+        # Rate limits and the honeypot are checked before this by
+        # core.middleware.form_guard_middleware
+        form = ContactForm(request.POST)
+        with metrics.timing('form'):
+            valid = form.is_valid()
+        if valid:
+            cd = form.cleaned_data
+            return cd, True, ContactForm(), None  # Return form data, submitted status, cleared form, and no error
     else:
         form = ContactForm()
     
     return None, submitted, form, error_message
 
+
+def form_page_etag(request, *args, **kwargs):
+    """ETag for the pages with a contact form (see has_csrf_cookie)."""
+    if not has_csrf_cookie(request):
+        return None
+    return page_etag(request.resolver_match.view_name, catalog.project_digest('temphist'))
+
+
+def form_page_last_modified(request, *args, **kwargs):
+    if not has_csrf_cookie(request):
+        return None
+    return page_last_modified(catalog.last_modified())
+
+
+def temphist_docs_etag(request):
+    """ETag for the TempHist docs page, or None until the README is cached."""
+    repo_info = catalog.get_repository('temphist', 'app')
+    if not repo_info:
+        return None
+    readme_digest = doc_digest(repo_info.readme_url)
+    if readme_digest is None:
+        return None
+    return page_etag('temphist_docs', catalog.project_digest('temphist'), readme_digest)
+
+
+@condition(etag_func=form_page_etag, last_modified_func=form_page_last_modified)
+@cached_page
 def home_view(request):
     """Home page view with hero, projects, and contact form."""
     form_data, submitted, form, error_message = handle_contact_form(request, "core/home.html")
@@ -72,7 +83,7 @@ def home_view(request):
         submitted = True
     
     # Get project data from centralized source
-    project = PROJECTS_DATA.get('temphist')
+    project = catalog.get_project('temphist')
     
     return render(request, "core/home.html", {
         "form": form, 
@@ -81,6 +92,8 @@ def home_view(request):
         "project": project
     })
 
+@condition(etag_func=form_page_etag, last_modified_func=form_page_last_modified)
+@cached_page
 def support_view(request):
     """Support page view with contact form."""
     form_data, submitted, form, error_message = handle_contact_form(request, "core/support.html")
@@ -95,6 +108,8 @@ def support_view(request):
         "error_message": error_message
     })
 
+@condition(etag_func=form_page_etag, last_modified_func=form_page_last_modified)
+@cached_page
 def contact_view(request):
     """Contact page view with contact form."""
     form_data, submitted, form, error_message = handle_contact_form(request, "core/contact.html")
@@ -109,133 +124,55 @@ def contact_view(request):
         "error_message": error_message
     })
 
-def temphist_docs_view(request):
+@condition(etag_func=temphist_docs_etag)
+async def temphist_docs_view(request):
     """TempHist app documentation page."""
-    # Get repository information from centralized PROJECTS_DATA
-    project = PROJECTS_DATA.get('temphist')
-    if not project:
-        return render(request, "core/404.html", status=404)
-    
-    # Find the Flutter app repository
-    repositories = project.get("repositories", [])
-    repo_info = None
-    for repo in repositories:
-        if repo.get("slug") == "app":
-            repo_info = repo
-            break
-    
+    # Get the Flutter app repository from the project catalog
+    repo_info = catalog.get_repository('temphist', 'app')
     if not repo_info:
         return render(request, "core/404.html", status=404)
     
-    # Add custom description for this specific view
-    repo_info['custom_description'] = 'A Flutter application that visualises historical average temperatures by year using horizontal bar charts. It makes use of the TempHist API to fetch temperature data.'
-    
-    try:
-        # Fetch README content from GitHub
-        response = requests.get(repo_info['readme_url'], timeout=10)
-        if response.status_code == 200:
-            readme_content = response.text
-            # Convert markdown to HTML (basic conversion)
-            html_content = convert_markdown_to_html(readme_content)
-        else:
-            html_content = "<p>Unable to load documentation from GitHub. Please check the repository URL.</p>"
-    except Exception as e:
-        html_content = f"<p>Error loading documentation: {str(e)}</p>"
+    # Pre-rendered by build_docs; otherwise the page is sent straight away and
+    # the README follows once fetched (without blocking the event loop)
+    html_content = get_prerendered_html(repo_info.readme_url)
+    if html_content is None and settings.DOCS_STREAMING and streaming_supported(request):
+        return stream_page(request, "core/github_docs.html", {
+            "repo_info": repo_info,
+            "custom_description": TEMPHIST_APP_DESCRIPTION
+        }, "content", aget_doc_html(repo_info.readme_url))
+    if html_content is None:
+        html_content = await aget_doc_html(repo_info.readme_url)
     
     return render(request, "core/github_docs.html", {
         "content": html_content,
-        "repo_info": repo_info
+        "repo_info": repo_info,
+        "custom_description": TEMPHIST_APP_DESCRIPTION
     })
 
-def convert_markdown_to_html(markdown_text):
-    """Basic markdown to HTML conversion."""
-    # Convert headers
-    markdown_text = re.sub(r'^### (.*$)', r'<h3>\1</h3>', markdown_text, flags=re.MULTILINE)
-    markdown_text = re.sub(r'^## (.*$)', r'<h2>\1</h2>', markdown_text, flags=re.MULTILINE)
-    markdown_text = re.sub(r'^# (.*$)', r'<h2>\1</h2>', markdown_text, flags=re.MULTILINE)  # Convert H1 to H2
-    
-    # Convert bold and italic
-    markdown_text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', markdown_text)
-    markdown_text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', markdown_text)
-    
-    # Convert code blocks
-    markdown_text = re.sub(r'```(\w+)?\n(.*?)```', r'<pre><code>\2</code></pre>', markdown_text, flags=re.DOTALL)
-    markdown_text = re.sub(r'`(.*?)`', r'<code>\1</code>', markdown_text)
-    
-    # Convert links
-    markdown_text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', markdown_text)
-    
-    # Convert lists - first pass: convert list items to HTML
-    lines = markdown_text.split('\n')
-    processed_lines = []
-    
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith('* ') or stripped.startswith('- '):
-            processed_lines.append(re.sub(r'^[\*\-] (.*$)', r'<li>\1</li>', line, flags=re.MULTILINE))
-        elif re.match(r'^\d+\. ', stripped):
-            processed_lines.append(re.sub(r'^\d+\. (.*$)', r'<li>\1</li>', line, flags=re.MULTILINE))
-        else:
-            processed_lines.append(line)
-    
-    # Second pass: wrap list items in ul/ol tags with proper start attributes
-    result = []
-    in_ul = False
-    in_ol = False
-    current_ol_start = 1
-    
-    for i, line in enumerate(processed_lines):
-        stripped = line.strip()
-        
-        if stripped.startswith('<li>'):
-            # Determine if this is an ordered list by checking the original line
-            original_line = lines[i] if i < len(lines) else ''
-            is_ordered = bool(re.match(r'^\d+\. ', original_line.strip()))
-            
-            if is_ordered:
-                # Extract the number from the original line
-                match = re.match(r'^(\d+)\. ', original_line.strip())
-                if match:
-                    number = int(match.group(1))
-                    
-                    if not in_ol:
-                        if in_ul:
-                            result.append('</ul>')
-                            in_ul = False
-                        # Use the actual number as the start value
-                        result.append(f'<ol start="{number}">')
-                        in_ol = True
-                        current_ol_start = number
-                    elif number != current_ol_start:
-                        # If the number changes, close current ol and start new one
-                        result.append('</ol>')
-                        result.append(f'<ol start="{number}">')
-                        current_ol_start = number
-            elif not in_ul:
-                if in_ol:
-                    result.append('</ol>')
-                    in_ol = False
-                result.append('<ul>')
-                in_ul = True
-            result.append(line)
-        else:
-            if in_ul:
-                result.append('</ul>')
-                in_ul = False
-            elif in_ol:
-                result.append('</ol>')
-                in_ol = False
-            result.append(line)
-    
-    if in_ul:
-        result.append('</ul>')
-    elif in_ol:
-        result.append('</ol>')
-    
-    markdown_text = '\n'.join(result)
-    
-    # Convert paragraphs
-    content = markdown_text
-    content = re.sub(r'\n\n([^<].*?)\n\n', r'\n\n<p>\1</p>\n\n', content, flags=re.DOTALL)
-    
-    return content
+
+def search_view(request):
+    """Search projects, documentation and blog posts."""
+    query = request.GET.get("q", "").strip()[:200]
+    results = search.search(query) if query else []
+    return render(request, "core/search.html", {
+        "query": query,
+        "results": results
+    })
+
+
+def metrics_view(request):
+    """Prometheus metrics of every worker, for requests with the METRICS_TOKEN bearer token."""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@never_cache
+def csrf_token_view(request):
+    """A CSRF token (and cookie) for the forms on exported pages (see core.export)."""
+    return JsonResponse({'token': get_token(request)})
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration, loaded automatically from the working directory:
+
+    gunicorn turnpiece.asgi:application
+
+The application is imported and warmed once in the master (core.startup.warm)
+and the workers are forked from it, so they serve their first request
+without importing or loading anything and share that memory copy-on-write.
+"""
+import os
+
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before forking
+    from core import startup
+
+    startup.warm()
+
+
+def post_fork(server, worker):
+    from core import startup
+
+    startup.after_fork()
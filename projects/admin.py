@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import Project, Repository, RepositoryTech, Tech
+
+
+class RepositoryInline(admin.StackedInline):
+    model = Repository
+    extra = 0
+    show_change_link = True
+
+
+class RepositoryTechInline(admin.TabularInline):
+    model = RepositoryTech
+    extra = 0
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'position', 'updated_at')
+    prepopulated_fields = {'slug': ('name',)}
+    inlines = [RepositoryInline]
+
+
+@admin.register(Repository)
+class RepositoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'project', 'slug', 'position')
+    list_select_related = ('project',)
+    inlines = [RepositoryTechInline]
+
+
+@admin.register(Tech)
+class TechAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
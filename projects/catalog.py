@@ -0,0 +1,332 @@
+"""
+Project catalog: the project data behind the catalog and documentation pages,
+plus digests of it used to version caches and validate conditional requests,
+and an index of the tech stacks it uses.
+
+The catalog lives in the database (Project, Repository and Tech in
+projects.models). Each process keeps an in-memory snapshot of it, loaded with
+a fixed three queries however many projects there are, and checks at most
+every CATALOG_CHECK_INTERVAL seconds whether the tables changed (one query).
+CatalogMiddleware does that check before the view runs, so views, including
+the async ones, read the snapshot without touching the database.
+
+The snapshot is made of frozen dataclasses with every derived field (parent
+project, tech slugs, URLs) filled in at load time, so it can be shared between
+threads and views never need to modify it.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.text import slugify
+
+from .models import Project, Repository, RepositoryTech, Tech
+
+# Seed data for `manage.py load_catalog`; the site reads the catalog from the
+# database (see projects.models)
+PROJECTS_DATA = {
+    'temphist': {
+        'slug': 'temphist',
+        'name': 'TempHist',
+        'description': 'Historical temperature visualisation and analysis platform',
+        'colour': '#242456',  # Dark blue colour
+        'logo_svg': 'assets/temphist-logo.svg',
+        'logo_png': 'assets/temphist-logo.png',
+        'overview': 'TempHist is a platform for visualising and analysing historical temperature data, compare the today\'s temperature with the temperatures on the same date and in the same location over the past 50 years. The project consists of an API that provides temperature data and analysis, along with a mobile app and a website that visualise the data.',
+        'repositories': [
+            {
+                'name': 'Flutter App',
+                'slug': 'app',
+                'description': 'Mobile app for historical temperature visualisation',
+                'github_url': 'https://github.com/turnpiece/temphist_app',
+                'readme_url': 'https://raw.githubusercontent.com/turnpiece/temphist_app/main/README.md',
+                'tech_stack': ['Flutter', 'Dart', 'Firebase'],
+                'features': [
+                    'Horizontal bar chart visualisation',
+                    'Historical temperature data display',
+                    'Currently available on iOS',
+                    'Firebase backend integration'
+                ],
+                'screenshot': '/static/assets/TempHist-iPhone-screenshot.png'
+            },
+            {
+                'name': 'Website',
+                'slug': 'website',
+                'description': 'Temperature history website',
+                'github_url': 'https://github.com/turnpiece/TempHist',
+                'readme_url': 'https://raw.githubusercontent.com/turnpiece/TempHist/main/README.md',
+                'tech_stack': ['HTML', 'CSS', 'JavaScript', 'Firebase'],
+                'features': [
+                    'Temperature history visualisation for your location',
+                ],
+                'screenshot': '/static/assets/TempHist-website-screenshot.png'
+            },
+            {
+                'name': 'API',
+                'slug': 'api',
+                'description': 'Backend API and data services',
+                'github_url': 'https://github.com/turnpiece/TempHist-API',
+                'readme_url': 'https://raw.githubusercontent.com/turnpiece/TempHist-API/main/README.md',
+                'tech_stack': ['Python', 'FastAPI', 'Redis'],
+                'features': [
+                    'Temperature data endpoints',
+                    'Data processing and analysis',
+                    'Authentication and authorization'
+                ],
+                'logo': '/static/assets/temphist-logo.png',
+            }
+        ]
+    }
+}
+
+
+_catalog = {'snapshot': None, 'checked_at': None}
+_catalog_lock = threading.Lock()
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogTech:
+    name: str
+    slug: str
+    url: str
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogRepository:
+    slug: str
+    name: str
+    description: str
+    github_url: str
+    readme_url: str
+    tech_stack: tuple
+    features: tuple
+    screenshot: str
+    logo: str
+    project_slug: str
+    project_name: str
+    project_url: str
+    url: str
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogProject:
+    slug: str
+    name: str
+    description: str
+    colour: str
+    logo_svg: str
+    logo_png: str
+    overview: str
+    repositories: tuple
+    url: str
+
+
+def _freeze_project(data, techs):
+    """Build a CatalogProject from a project dict (see Project.as_dict).
+
+    techs maps tech slugs (Tech.slug, as edited in the admin) to CatalogTech
+    and is shared between projects, so each tech is only built once per
+    snapshot.
+    """
+    for tech in (tech for repo in data['repositories'] for tech in repo['tech_stack']):
+        if tech['slug'] not in techs:
+            techs[tech['slug']] = CatalogTech(
+                tech['name'], tech['slug'], reverse('project_list_by_tech', args=[tech['slug']]),
+            )
+
+    project_url = reverse('project_detail', args=[data['slug']])
+    repositories = tuple(
+        CatalogRepository(
+            slug=repo['slug'],
+            name=repo['name'],
+            description=repo['description'],
+            github_url=repo['github_url'],
+            readme_url=repo['readme_url'],
+            tech_stack=tuple(techs[tech['slug']] for tech in repo['tech_stack']),
+            features=tuple(repo['features']),
+            screenshot=repo['screenshot'],
+            logo=repo['logo'],
+            project_slug=data['slug'],
+            project_name=data['name'],
+            project_url=project_url,
+            url=reverse('repository_detail', args=[data['slug'], repo['slug']]),
+        )
+        for repo in data['repositories']
+    )
+    return CatalogProject(
+        slug=data['slug'],
+        name=data['name'],
+        description=data['description'],
+        colour=data['colour'],
+        logo_svg=data['logo_svg'],
+        logo_png=data['logo_png'],
+        overview=data['overview'],
+        repositories=repositories,
+        url=project_url,
+    )
+
+
+def build_tech_index(projects):
+    """Index the tech stacks used by projects.
+
+    Returns a dict with:
+
+    - names: tech slug -> display name, e.g. 'graphic-package' -> 'Graphic Package'
+    - slugs: display name -> tech slug
+    - projects: tech slug -> projects with a repository using it, in catalog order
+    - counts: tech slug -> number of those projects
+    """
+    names = {}
+    projects_by_tech = {}
+    for project in projects.values():
+        for repo in project.repositories:
+            for tech in repo.tech_stack:
+                names.setdefault(tech.slug, tech.name)
+                tech_projects = projects_by_tech.setdefault(tech.slug, [])
+                if not tech_projects or tech_projects[-1] is not project:
+                    tech_projects.append(project)
+
+    return {
+        'names': names,
+        'slugs': {name: slug for slug, name in names.items()},
+        'projects': {slug: tuple(tech_projects) for slug, tech_projects in projects_by_tech.items()},
+        'counts': {slug: len(tech_projects) for slug, tech_projects in projects_by_tech.items()},
+    }
+
+
+def _catalog_state():
+    """Return a fingerprint of the catalog tables (one query)."""
+    state = Project.objects.aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+    return state['count'], state['updated_at']
+
+
+def _load_snapshot(state):
+    """Load the whole catalog (three queries) and index it."""
+    repositories = Repository.objects.prefetch_related(
+        Prefetch('tech_links', queryset=RepositoryTech.objects.select_related('tech'))
+    )
+    queryset = Project.objects.prefetch_related(Prefetch('repositories', queryset=repositories))
+    data = {project.slug: project.as_dict() for project in queryset}
+
+    techs = {}
+    projects = {slug: _freeze_project(project_data, techs) for slug, project_data in data.items()}
+    return {
+        'state': state,
+        'projects': MappingProxyType(projects),
+        'repositories': MappingProxyType({
+            (project.slug, repo.slug): repo
+            for project in projects.values()
+            for repo in project.repositories
+        }),
+        'version': _digest(data)[:16],
+        'digests': {slug: _digest(project_data) for slug, project_data in data.items()},
+        'tech_index': build_tech_index(projects),
+        'last_modified': state[1].timestamp() if state[1] else 0,
+    }
+
+
+def get_catalog():
+    """Return the catalog snapshot, reloading it if the database has changed."""
+    with _catalog_lock:
+        now = time.monotonic()
+        checked_at = _catalog['checked_at']
+        if checked_at is not None and now - checked_at < settings.CATALOG_CHECK_INTERVAL:
+            return _catalog['snapshot']
+
+        state = _catalog_state()
+        if _catalog['snapshot'] is None or _catalog['snapshot']['state'] != state:
+            _catalog['snapshot'] = _load_snapshot(state)
+        _catalog['checked_at'] = now
+        return _catalog['snapshot']
+
+
+def check_due():
+    """Return True if get_catalog() would query the database."""
+    checked_at = _catalog['checked_at']
+    return checked_at is None or time.monotonic() - checked_at >= settings.CATALOG_CHECK_INTERVAL
+
+
+def invalidate():
+    """Make the next get_catalog() check the database."""
+    _catalog['checked_at'] = None
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Repository)
+@receiver([post_save, post_delete], sender=RepositoryTech)
+@receiver([post_save, post_delete], sender=Tech)
+def _invalidate_on_change(sender, **kwargs):
+    # Other processes notice on their next check
+    invalidate()
+
+
+def current():
+    """Return the last loaded snapshot, loading it if there is none yet."""
+    return _catalog['snapshot'] or get_catalog()
+
+
+def get_projects():
+    """Return a read-only {project slug: CatalogProject} map in catalog order."""
+    return current()['projects']
+
+
+def get_project(project_slug):
+    """Return the CatalogProject for project_slug, or None if unknown."""
+    return current()['projects'].get(project_slug)
+
+
+def get_repository(project_slug, repo_slug):
+    """Return the CatalogRepository for the slugs, or None if unknown."""
+    return current()['repositories'].get((project_slug, repo_slug))
+
+
+def catalog_version():
+    """Return a short hash of the catalog, used to version cached pages.
+
+    Any change to the catalog yields new cache keys everywhere.
+    """
+    return current()['version']
+
+
+def project_digest(project_slug):
+    """Return the digest of one project's catalog entry, or None if unknown."""
+    return current()['digests'].get(project_slug)
+
+
+def last_modified():
+    """Return the time the catalog last changed, as a timestamp."""
+    return current()['last_modified']
+
+
+def tech_name(tech_slug):
+    """Return the display name for a tech slug, or None if no project uses it."""
+    names = current()['tech_index']['names']
+    return names.get(tech_slug, names.get(tech_slug.lower()))
+
+
+def tech_slug(tech_name):
+    """Return the URL slug for a tech name."""
+    return current()['tech_index']['slugs'].get(tech_name) or slugify(tech_name)
+
+
+def projects_using(tech_slug):
+    """Return the projects with a repository using the tech, in catalog order."""
+    projects = current()['tech_index']['projects']
+    return projects.get(tech_slug, projects.get(tech_slug.lower(), []))
+
+
+def tech_counts():
+    """Return {tech slug: number of projects using it}, for faceting."""
+    return current()['tech_index']['counts']
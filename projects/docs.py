@@ -0,0 +1,151 @@
+"""
+Rendered documentation for the repository pages.
+
+`manage.py build_docs` renders every README in the catalog at deploy time and
+writes the HTML to DOCS_ROOT as content-addressed artifacts (named after the
+SHA-256 of the HTML) plus a manifest mapping README URLs to artifact files.
+Requests then read the pre-rendered artifact and only fall back to fetching
+the README from GitHub when no artifact exists, e.g. in development.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics, singleflight
+from core.markdown import convert_markdown_to_html
+from .readme import get_readme, known_digest
+
+MANIFEST_NAME = 'manifest.json'
+HTML_CACHE_PREFIX = 'doc_html:'
+
+_manifest = {'mtime': None, 'docs': {}}
+_pending = {}
+
+
+def artifact_name(html):
+    """Return the content-addressed file name for rendered HTML."""
+    return hashlib.sha256(html.encode()).hexdigest() + '.html'
+
+
+def write_manifest(docs, root=None):
+    """Atomically replace the manifest in root (DOCS_ROOT by default)."""
+    root = root or settings.DOCS_ROOT
+    path = os.path.join(root, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump({'docs': docs}, manifest_file, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def load_manifest():
+    """Return the manifest's {readme_url: entry} map, reloading it if rebuilt."""
+    path = os.path.join(settings.DOCS_ROOT, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    if mtime != _manifest['mtime']:
+        with open(path) as manifest_file:
+            _manifest['docs'] = json.load(manifest_file)['docs']
+        _manifest['mtime'] = mtime
+    return _manifest['docs']
+
+
+@functools.lru_cache(maxsize=256)
+def _read_artifact(path):
+    # Artifacts are content-addressed, so a path's contents never change
+    with open(path) as artifact_file:
+        return artifact_file.read()
+
+
+def get_prerendered_html(url):
+    """Return the pre-rendered HTML for a README url, or None if not built."""
+    entry = load_manifest().get(url)
+    if not entry:
+        return None
+    try:
+        return _read_artifact(os.path.join(settings.DOCS_ROOT, entry['file']))
+    except OSError:
+        return None
+
+
+def doc_digest(url):
+    """Return a digest of the README content for url without fetching it.
+
+    Uses the artifact name (a hash of the rendered HTML) or the digest of the
+    README as this process last read it; returns None if neither is known.
+    Only in-process state is read, as the async documentation views call it
+    (through condition's etag_func) on the event loop.
+    """
+    entry = load_manifest().get(url)
+    if entry:
+        return entry['file']
+    return known_digest(url)
+
+
+def render_readme_html(readme_content):
+    """Convert README markdown to HTML, once per distinct README.
+
+    Rendered HTML is cached by the hash of the markdown, and concurrent
+    requests for the same README share a single conversion.
+    """
+    key = HTML_CACHE_PREFIX + hashlib.sha256(readme_content.encode()).hexdigest()
+    html_content = cache.get(key)
+    if html_content is None:
+        html_content = singleflight.do(key, lambda: _convert_and_cache(key, readme_content))
+    return html_content
+
+
+def _convert_and_cache(key, readme_content):
+    with metrics.timing('markdown'):
+        html_content = convert_markdown_to_html(readme_content)
+    cache.set(key, html_content, settings.README_CACHE_STALE_TTL)
+    return html_content
+
+
+def get_doc_html(url):
+    """Return the documentation HTML for a README url.
+
+    Uses the artifact written by build_docs when there is one, otherwise
+    fetches (through the README cache) and converts the README.
+    """
+    html_content = get_prerendered_html(url)
+    if html_content is not None:
+        return html_content
+
+    try:
+        # Fetch README content from GitHub (cached, see projects.readme)
+        readme_content = get_readme(url)
+        if readme_content is not None:
+            return render_readme_html(readme_content)
+        return "<p>Unable to load documentation from GitHub. Please check the repository URL.</p>"
+    except Exception as e:
+        return f"<p>Error loading documentation: {str(e)}</p>"
+
+
+async def aget_doc_html(url):
+    """Async version of get_doc_html.
+
+    Pre-rendered artifacts are read directly; README fetches and conversion
+    run in a worker thread so a slow GitHub never blocks the event loop.
+    Concurrent requests for the same url on one event loop await a single
+    task rather than each holding a thread while they wait.
+    """
+    html_content = get_prerendered_html(url)
+    if html_content is not None:
+        return html_content
+
+    key = (asyncio.get_running_loop(), url)
+    task = _pending.get(key)
+    if task is None:
+        task = _pending[key] = asyncio.ensure_future(
+            sync_to_async(get_doc_html, thread_sensitive=False)(url)
+        )
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    return await asyncio.shield(task)
@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.markdown import convert_markdown_to_html
+from projects.docs import artifact_name, load_manifest, write_manifest
+from projects.readme import fetch_readme
+from projects import catalog
+
+
+def render_readme(url):
+    """Fetch and convert one README; returns (url, html, error)."""
+    try:
+        readme_content = fetch_readme(url)
+    except Exception as e:
+        return url, None, str(e)
+    if readme_content is None:
+        return url, None, 'GitHub returned an error'
+    return url, convert_markdown_to_html(readme_content), None
+
+
+class Command(BaseCommand):
+    help = 'Fetch and render every README in the project catalog into DOCS_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Number of READMEs to fetch concurrently (default 8)',
+        )
+
+    def handle(self, *args, **options):
+        root = settings.DOCS_ROOT
+        os.makedirs(root, exist_ok=True)
+
+        urls = sorted({
+            repo.readme_url
+            for repo in catalog.get_catalog()['repositories'].values()
+            if repo.readme_url
+        })
+        previous = load_manifest()
+        docs = {}
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for url, html, error in executor.map(render_readme, urls):
+                if error:
+                    if url in previous:
+                        docs[url] = previous[url]
+                        self.stderr.write(f'{url}: {error}; keeping the previous build')
+                    else:
+                        self.stderr.write(f'{url}: {error}; the page will fetch it live')
+                    continue
+
+                name = artifact_name(html)
+                path = os.path.join(root, name)
+                if not os.path.exists(path):
+                    # Pages read artifacts while the build runs; never expose a partial file
+                    with open(path + '.tmp', 'w') as artifact_file:
+                        artifact_file.write(html)
+                    os.replace(path + '.tmp', path)
+                docs[url] = {'file': name, 'bytes': len(html.encode())}
+                self.stdout.write(f'{url}: {name}')
+
+        write_manifest(docs, root)
+
+        # Remove artifacts no longer referenced by the manifest
+        keep = {entry['file'] for entry in docs.values()}
+        for name in os.listdir(root):
+            if name.endswith('.html') and name not in keep:
+                os.remove(os.path.join(root, name))
+
+        self.stdout.write(self.style.SUCCESS(f'Built {len(docs)} of {len(urls)} documentation pages in {root}'))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import slugify
+
+from projects.catalog import PROJECTS_DATA
+from projects.models import Project, Repository, RepositoryTech, Tech
+
+PROJECT_FIELDS = ('name', 'description', 'colour', 'logo_svg', 'logo_png', 'overview')
+REPOSITORY_FIELDS = ('name', 'description', 'github_url', 'readme_url', 'features', 'screenshot', 'logo')
+
+
+class Command(BaseCommand):
+    help = 'Load the projects in projects.catalog.PROJECTS_DATA into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Overwrite projects that already exist (by default only missing ones are created)',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        existing = set(Project.objects.values_list('slug', flat=True))
+        techs = {tech.name: tech for tech in Tech.objects.all()}
+        tech_slugs = {tech.slug for tech in techs.values()}
+        loaded = 0
+
+        for position, (slug, data) in enumerate(PROJECTS_DATA.items()):
+            if slug in existing and not options['update']:
+                self.stdout.write(f'{slug}: already loaded')
+                continue
+
+            project, _ = Project.objects.update_or_create(
+                slug=slug,
+                defaults={'position': position, **{field: data.get(field, '') for field in PROJECT_FIELDS}},
+            )
+            project.repositories.all().delete()
+
+            for repo_position, repo_data in enumerate(data['repositories']):
+                repo = Repository.objects.create(
+                    project=project,
+                    slug=repo_data['slug'],
+                    position=repo_position,
+                    **{field: repo_data.get(field, [] if field == 'features' else '') for field in REPOSITORY_FIELDS},
+                )
+                for tech_position, name in enumerate(repo_data.get('tech_stack', [])):
+                    if name not in techs:
+                        # Names that slugify alike (e.g. 'C++' and 'C') get distinct slugs
+                        tech_slug = base = slugify(name)
+                        number = 2
+                        while tech_slug in tech_slugs:
+                            tech_slug = f'{base}-{number}'
+                            number += 1
+                        tech_slugs.add(tech_slug)
+                        techs[name] = Tech.objects.create(name=name, slug=tech_slug)
+                    RepositoryTech.objects.create(repository=repo, tech=techs[name], position=tech_position)
+
+            loaded += 1
+            self.stdout.write(f'{slug}: loaded {len(data["repositories"])} repositories')
+
+        self.stdout.write(self.style.SUCCESS(f'Loaded {loaded} of {len(PROJECTS_DATA)} projects'))
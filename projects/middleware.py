@@ -0,0 +1,23 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.decorators import sync_and_async_middleware
+
+from . import catalog
+
+
+@sync_and_async_middleware
+def catalog_middleware(get_response):
+    """Refresh the catalog snapshot (see projects.catalog) before the view runs.
+
+    Views then read the snapshot without queries, which async views couldn't
+    run on the event loop anyway.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if catalog.check_due():
+                await sync_to_async(catalog.get_catalog)()
+            return await get_response(request)
+    else:
+        def middleware(request):
+            catalog.get_catalog()
+            return get_response(request)
+    return middleware
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tech',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'tech',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('colour', models.CharField(blank=True, max_length=7)),
+                ('logo_svg', models.CharField(blank=True, max_length=255)),
+                ('logo_png', models.CharField(blank=True, max_length=255)),
+                ('overview', models.TextField(blank=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['position', 'name'],
+                'indexes': [models.Index(fields=['position', 'name'], name='projects_pr_positio_17de5b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Repository',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField()),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('github_url', models.URLField(blank=True)),
+                ('readme_url', models.URLField(blank=True)),
+                ('features', models.JSONField(blank=True, default=list)),
+                ('screenshot', models.CharField(blank=True, max_length=255)),
+                ('logo', models.CharField(blank=True, max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repositories', to='projects.project')),
+            ],
+            options={
+                'verbose_name_plural': 'repositories',
+                'ordering': ['position', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RepositoryTech',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tech_links', to='projects.repository')),
+                ('tech', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repository_links', to='projects.tech')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='tech',
+            field=models.ManyToManyField(related_name='repositories', through='projects.RepositoryTech', to='projects.tech'),
+        ),
+        migrations.AddConstraint(
+            model_name='repositorytech',
+            constraint=models.UniqueConstraint(fields=('repository', 'tech'), name='unique_tech_per_repository'),
+        ),
+        migrations.AddConstraint(
+            model_name='repository',
+            constraint=models.UniqueConstraint(fields=('project', 'slug'), name='unique_repository_slug_per_project'),
+        ),
+    ]
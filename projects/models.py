@@ -0,0 +1,117 @@
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+
+class Tech(models.Model):
+    """A language, framework or service used by repositories."""
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'tech'
+
+    def __str__(self):
+        return self.name
+
+
+class Project(models.Model):
+    slug = models.SlugField(unique=True)
+    name = models.CharField(max_length=200)
+    description = models.CharField(max_length=255, blank=True)
+    colour = models.CharField(max_length=7, blank=True)
+    logo_svg = models.CharField(max_length=255, blank=True)
+    logo_png = models.CharField(max_length=255, blank=True)
+    overview = models.TextField(blank=True)
+    position = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['position', 'name']
+        indexes = [models.Index(fields=['position', 'name'])]
+
+    def __str__(self):
+        return self.name
+
+    def as_dict(self):
+        """Return the project as a catalog dict (repositories must be prefetched)."""
+        return {
+            'slug': self.slug,
+            'name': self.name,
+            'description': self.description,
+            'colour': self.colour,
+            'logo_svg': self.logo_svg,
+            'logo_png': self.logo_png,
+            'overview': self.overview,
+            'repositories': [repo.as_dict() for repo in self.repositories.all()],
+        }
+
+
+class Repository(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='repositories')
+    slug = models.SlugField()
+    name = models.CharField(max_length=200)
+    description = models.CharField(max_length=255, blank=True)
+    github_url = models.URLField(blank=True)
+    readme_url = models.URLField(blank=True)
+    features = models.JSONField(default=list, blank=True)
+    screenshot = models.CharField(max_length=255, blank=True)
+    logo = models.CharField(max_length=255, blank=True)
+    tech = models.ManyToManyField(Tech, through='RepositoryTech', related_name='repositories')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'name']
+        verbose_name_plural = 'repositories'
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'slug'], name='unique_repository_slug_per_project'),
+        ]
+
+    def __str__(self):
+        return f'{self.project} / {self.name}'
+
+    def as_dict(self):
+        """Return the repository as a catalog dict (tech_links must be prefetched)."""
+        return {
+            'name': self.name,
+            'slug': self.slug,
+            'description': self.description,
+            'github_url': self.github_url,
+            'readme_url': self.readme_url,
+            'tech_stack': [{'name': link.tech.name, 'slug': link.tech.slug} for link in self.tech_links.all()],
+            'features': self.features,
+            'screenshot': self.screenshot,
+            'logo': self.logo,
+        }
+
+
+class RepositoryTech(models.Model):
+    """A tech in a repository's stack, in display order."""
+    repository = models.ForeignKey(Repository, on_delete=models.CASCADE, related_name='tech_links')
+    tech = models.ForeignKey(Tech, on_delete=models.CASCADE, related_name='repository_links')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['repository', 'tech'], name='unique_tech_per_repository'),
+        ]
+
+
+# projects.catalog notices changes by the projects' latest updated_at, so
+# changes to a project's repositories or tech bump it too
+@receiver([post_save, post_delete], sender=Repository)
+def touch_repository_project(sender, instance, **kwargs):
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=RepositoryTech)
+def touch_repository_tech_project(sender, instance, **kwargs):
+    Project.objects.filter(repositories__pk=instance.repository_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tech)
+def touch_tech_projects(sender, instance, **kwargs):
+    Project.objects.filter(repositories__tech_links__tech=instance).update(updated_at=timezone.now())
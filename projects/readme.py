@@ -0,0 +1,126 @@
+"""
+Cached access to the GitHub READMEs shown on the documentation pages.
+
+READMEs are cached per URL together with the ETag GitHub returned. An entry is
+fresh for README_CACHE_TTL seconds; after that it is still served for up to
+README_CACHE_STALE_TTL seconds while a background thread revalidates it with
+If-None-Match, so an unchanged README only costs a 304 and a slow or failing
+upstream never delays the page.
+
+Each process also remembers the digest of the READMEs it has fetched or read
+(known_digest), so ETags can be built without cache I/O, which the async
+documentation views couldn't do on the event loop.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core import metrics, singleflight, upstream
+
+CACHE_KEY_PREFIX = 'readme:'
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+_digests = {}
+
+
+def _cache_key(url):
+    return CACHE_KEY_PREFIX + hashlib.sha1(url.encode()).hexdigest()
+
+
+def _remember(url, entry):
+    _digests[url] = (entry.get('digest'), time.monotonic())
+
+
+def _fetch(url, entry=None):
+    """Fetch url from GitHub, revalidating entry if given.
+
+    Returns the new cache entry, or None if GitHub answered with an error.
+    Network errors (upstream.UpstreamError) propagate to the caller.
+    """
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+
+    with metrics.timing('readme_fetch'):
+        response = upstream.get(url, headers=headers)
+    if response.status_code == 304 and entry:
+        entry = dict(entry, fetched_at=time.time())
+    elif response.status_code == 200:
+        entry = {
+            'text': response.text,
+            'digest': hashlib.sha256(response.content).hexdigest(),
+            'etag': response.headers.get('ETag'),
+            'fetched_at': time.time(),
+        }
+    else:
+        return None
+
+    cache.set(_cache_key(url), entry, settings.README_CACHE_STALE_TTL)
+    _remember(url, entry)
+    return entry
+
+
+def _revalidate(url, entry):
+    try:
+        _fetch(url, entry)
+    except upstream.UpstreamError:
+        pass  # Keep serving the stale copy until GitHub is reachable again
+    finally:
+        # cache.set() reaches the DatabaseCache, which opened a connection
+        # for this thread
+        connection.close()
+        with _revalidating_lock:
+            _revalidating.discard(url)
+
+
+def _revalidate_in_background(url, entry):
+    with _revalidating_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+    threading.Thread(target=_revalidate, args=(url, entry), daemon=True).start()
+
+
+def fetch_readme(url):
+    """Fetch the README at url from GitHub, refreshing the cached copy.
+
+    Returns None if GitHub returned an error; network errors are raised.
+    """
+    entry = _fetch(url)
+    return entry['text'] if entry else None
+
+
+def known_digest(url):
+    """Return the digest of the README at url as this process last saw it, or None.
+
+    Never touches the cache, so it is safe on the event loop. A digest is
+    only trusted for README_CACHE_TTL seconds: another process may have
+    refreshed the README since, and the next page render records the new one.
+    """
+    digest, seen_at = _digests.get(url, (None, 0))
+    if digest is None or time.monotonic() - seen_at >= settings.README_CACHE_TTL:
+        return None
+    return digest
+
+
+def get_readme(url):
+    """Return the README markdown at url, or None if GitHub returned an error.
+
+    Cached copies are returned immediately, even when stale; only a cold cache
+    waits on GitHub, in which case network errors are raised. Concurrent cold
+    misses for the same url share a single fetch.
+    """
+    key = _cache_key(url)
+    entry = cache.get(key)
+    if entry is None:
+        return singleflight.do(key, lambda: fetch_readme(url))
+
+    _remember(url, entry)
+    if time.time() - entry['fetched_at'] >= settings.README_CACHE_TTL:
+        _revalidate_in_background(url, entry)
+    return entry['text']
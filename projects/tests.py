@@ -0,0 +1,270 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+
+from core import upstream
+from core.bench import StubUpstream
+from core.management.commands.bench_markdown import build_document
+from core.views import temphist_docs_view
+
+from . import catalog, readme
+from .docs import artifact_name, write_manifest
+from .models import Project, Repository, RepositoryTech, Tech
+
+# Every cache a test touches is its own, so nothing leaks between tests
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'projects-tests',
+        'OPTIONS': {'L2': 'shared', 'L1_BYPASS': ['singleflight', 'ratelimit']},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'projects-tests',
+    },
+}
+
+# As in production, where the shared cache is a DatabaseCache
+DATABASE_CACHES = dict(TEST_CACHES, shared={
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'projects_tests_cache',
+})
+
+
+class CatalogTestCase(TestCase):
+    """Loads the catalog from PROJECTS_DATA and starts every test with empty caches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('load_catalog', stdout=io.StringIO())
+
+    def setUp(self):
+        docs_root = tempfile.TemporaryDirectory()
+        self.addCleanup(docs_root.cleanup)
+        settings_override = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=TEST_CACHES,
+            DOCS_ROOT=docs_root.name,
+            # Keep metric flushes out of the query counts
+            METRICS_FLUSH_INTERVAL=3600,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        catalog.invalidate()
+        catalog.get_catalog()
+
+    def build_docs(self):
+        """Write a pre-rendered artifact for every README, as build_docs would."""
+        docs = {}
+        for repo in catalog.get_catalog()['repositories'].values():
+            html = f'<h2>{repo.name}</h2>'
+            with open(os.path.join(settings.DOCS_ROOT, artifact_name(html)), 'w') as artifact_file:
+                artifact_file.write(html)
+            docs[repo.readme_url] = {'file': artifact_name(html), 'bytes': len(html)}
+        write_manifest(docs)
+
+
+async def read(response):
+    """Return a response's body, reading streamed bodies to the end."""
+    if response.streaming:
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return response.content
+
+
+async def fetch(client, path):
+    """GET path; returns (status, body, seconds)."""
+    started = time.perf_counter()
+    response = await client.get(path)
+    body = await read(response)
+    return response.status_code, body, time.perf_counter() - started
+
+
+class SlowUpstreamTests(CatalogTestCase):
+    """Documentation pages under ASGI while GitHub is slow."""
+
+    LATENCY = 0.4
+
+    def setUp(self):
+        super().setUp()
+        self.stub = StubUpstream(build_document(4 * 1024), latency=self.LATENCY)
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        settings_override = override_settings(UPSTREAM_OVERRIDE_URL=self.stub.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        upstream.reset_pools()
+
+    async def test_concurrent_pages_do_not_queue_behind_slow_fetches(self):
+        repo_urls = [repo.url for repo in catalog.get_project('temphist').repositories]
+        doc_paths = repo_urls * 4
+        list_paths = ['/projects/', '/projects/temphist/'] * 2
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch(self.async_client, path) for path in doc_paths + list_paths))
+        elapsed = time.perf_counter() - started
+
+        for status, body, _ in results:
+            self.assertEqual(status, 200)
+        for _, body, _ in results[:len(doc_paths)]:
+            self.assertNotIn(b'Error loading documentation', body)
+
+        # One fetch per README, all in flight at once: fetched one after
+        # another they would take len(repo_urls) * LATENCY
+        self.assertEqual(self.stub.requests, len(repo_urls))
+        self.assertLess(elapsed, 2 * self.LATENCY)
+        # Pages that don't need GitHub don't wait for it
+        for _, _, seconds in results[len(doc_paths):]:
+            self.assertLess(seconds, self.LATENCY)
+
+
+class DatabaseCacheTests(TransactionTestCase):
+    """The async documentation views with a DatabaseCache behind the L1 cache.
+
+    A TransactionTestCase, as READMEs are fetched and cached in worker
+    threads, which have database connections of their own.
+    """
+
+    def setUp(self):
+        call_command('load_catalog', stdout=io.StringIO())
+        docs_root = tempfile.TemporaryDirectory()
+        self.addCleanup(docs_root.cleanup)
+        self.stub = StubUpstream(build_document(4 * 1024))
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        settings_override = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            CACHES=DATABASE_CACHES,
+            DOCS_ROOT=docs_root.name,
+            METRICS_FLUSH_INTERVAL=3600,
+            UPSTREAM_OVERRIDE_URL=self.stub.url,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('createcachetable', stdout=io.StringIO())
+        cache.clear()
+        catalog.invalidate()
+        catalog.get_catalog()
+        upstream.reset_pools()
+        # Forget READMEs earlier tests fetched, so the first request has no ETag
+        readme._digests.clear()
+
+    async def test_repository_page(self):
+        path = catalog.get_repository('temphist', 'app').url
+        status, body, _ = await fetch(self.async_client, path)
+        self.assertEqual(status, 200)
+        self.assertNotIn(b'Error loading documentation', body)
+
+        # Now the README is cached its ETag is built on the event loop
+        response = await self.async_client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        response = await self.async_client.get(path, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.stub.requests, 1)
+
+    async def test_temphist_docs_page(self):
+        factory = AsyncRequestFactory()
+
+        async def get(**headers):
+            request = factory.get('/', headers=headers)
+            request.user = AnonymousUser()
+            return await temphist_docs_view(request)
+
+        response = await get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'Error loading documentation', await read(response))
+        response = await get()
+        self.assertIn('ETag', response)
+        response = await get(**{'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+def add_projects(count, repositories=3, techs=3):
+    """Add count projects with repositories using techs shared between them."""
+    tech_objects = [Tech.objects.get_or_create(name=f'Tech {i}', slug=f'tech-{i}')[0] for i in range(techs)]
+    for number in range(count):
+        project = Project.objects.create(slug=f'project-{number}', name=f'Project {number}', position=100 + number)
+        for repo_number in range(repositories):
+            repo = Repository.objects.create(
+                project=project, slug=f'repo-{repo_number}', name=f'Repo {repo_number}',
+                readme_url=f'https://raw.githubusercontent.com/example/{number}-{repo_number}/main/README.md',
+                position=repo_number,
+            )
+            for position, tech in enumerate(tech_objects):
+                RepositoryTech.objects.create(repository=repo, tech=tech, position=position)
+
+
+@override_settings(CATALOG_CHECK_INTERVAL=0)
+class QueryCountTests(CatalogTestCase):
+    """Pages cost the same queries whatever the size of the catalog."""
+
+    PAGES = [
+        '/projects/',
+        '/projects/tech/python/',
+        '/projects/temphist/',
+        '/projects/temphist/api/',
+    ]
+
+    def assert_page_queries(self):
+        self.build_docs()
+        for path in self.PAGES:
+            with self.subTest(path=path):
+                # With the snapshot loaded, a page only checks for catalog changes
+                with self.assertNumQueries(1):
+                    response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_small_catalog(self):
+        self.assert_page_queries()
+
+    def test_large_catalog(self):
+        add_projects(50)
+        catalog.get_catalog()
+        self.assertEqual(len(catalog.get_projects()), 51)
+        self.assert_page_queries()
+
+    def test_snapshot_reload(self):
+        self.build_docs()
+        add_projects(1)
+        # A changed catalog is reloaded in one check and three queries...
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.get('/projects/').status_code, 200)
+        # ...and after that only checked
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/projects/project-0/').status_code, 200)
+        self.assertIsNotNone(catalog.get_project('project-0'))
+
+
+class TechSlugTests(CatalogTestCase):
+    """Tech URLs use the slugs stored in the database."""
+
+    def test_slug_edited_in_admin(self):
+        tech = Tech.objects.get(name='Python')
+        tech.slug = 'python-lang'
+        tech.save()
+        catalog.invalidate()
+        catalog.get_catalog()
+        self.assertEqual(catalog.tech_slug('Python'), 'python-lang')
+        self.assertEqual(self.client.get('/projects/tech/python-lang/').status_code, 200)
+        self.assertEqual(self.client.get('/projects/tech/python/').status_code, 404)
+
+    def test_names_that_slugify_alike(self):
+        add_projects(1, repositories=1, techs=0)
+        repo = Repository.objects.get(project__slug='project-0')
+        for position, (name, slug) in enumerate([('C', 'c'), ('C++', 'cpp')]):
+            RepositoryTech.objects.create(repository=repo, tech=Tech.objects.create(name=name, slug=slug), position=position)
+        catalog.invalidate()
+        catalog.get_catalog()
+        self.assertEqual(catalog.tech_name('c'), 'C')
+        self.assertEqual(catalog.tech_name('cpp'), 'C++')
+        self.assertEqual([tech.url for tech in catalog.get_repository('project-0', 'repo-0').tech_stack],
+                         ['/projects/tech/c/', '/projects/tech/cpp/'])
@@ -0,0 +1,20 @@
+"""
+ASGI config for turnpiece project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it under gunicorn, which reads the ASGI worker class and preloading
+hooks from gunicorn.conf.py:
+
+    gunicorn turnpiece.asgi:application
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'turnpiece.settings')
+
+application = get_asgi_application()
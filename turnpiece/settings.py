@@ -46,14 +46,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.timing_middleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.export.exported_site_middleware',
+    'core.middleware.form_guard_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'projects.middleware.catalog_middleware',
 ]
 
 ROOT_URLCONF = 'turnpiece.urls'
@@ -69,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.page_cache_csrf',
             ],
         },
     },
@@ -97,6 +101,50 @@ if os.environ.get('DATABASE_URL'):
     )
 
 
+# Caching
+# core.cache.TieredCache keeps a small in-process LRU (L1) in front of a cache
+# shared by every worker (L2, the 'shared' alias). L2 is the database cache on
+# Render (`manage.py createcachetable`), a file cache in development, or any
+# backend set with SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION, e.g.
+# django.core.cache.backends.redis.RedisCache with a redis:// URL.
+
+if os.environ.get('SHARED_CACHE_BACKEND'):
+    SHARED_CACHE = {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', ''),
+    }
+elif os.environ.get('DATABASE_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'tiered',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_BYTES': int(os.environ.get('L1_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+            'L1_MAX_ENTRY_BYTES': 1024 * 1024,
+            'L1_TIMEOUT': int(os.environ.get('L1_CACHE_TIMEOUT', 5)),
+            # Locks and counters must be read from L2 by every process
+            'L1_BYPASS': ['singleflight', 'ratelimit'],
+            # Fragment keys include the catalog version, so their values never go stale
+            'L1_TIMEOUTS': {'fragment': int(os.environ.get('FRAGMENT_CACHE_L1_TIMEOUT', 3600))},
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -140,6 +188,40 @@ STATICFILES_DIRS = [
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Widths (px) of the responsive image variants built by `manage.py build_images`
+RESPONSIVE_IMAGE_WIDTHS = [160, 320, 480, 640, 960, 1280]
+
+# Pre-rendered README documentation written by `manage.py build_docs`
+DOCS_ROOT = Path(os.environ.get('DOCS_ROOT', STATIC_ROOT / 'docs'))
+
+# Stream documentation pages that aren't pre-rendered: the page is sent while
+# the README is fetched, which then follows (core.streaming, ASGI only)
+DOCS_STREAMING = os.environ.get('DOCS_STREAMING', 'True') == 'True'
+
+# Per-template critical CSS written by `manage.py build_critical_css`
+CRITICAL_CSS_ROOT = Path(os.environ.get('CRITICAL_CSS_ROOT', STATIC_ROOT / 'critical'))
+
+# Blog posts (Markdown), and the index `manage.py build_blog` compiles them into
+BLOG_POSTS_DIR = Path(os.environ.get('BLOG_POSTS_DIR', BASE_DIR / 'blog' / 'posts'))
+BLOG_ROOT = Path(os.environ.get('BLOG_ROOT', STATIC_ROOT / 'blog'))
+
+# Posts per page on the blog and tag listings
+BLOG_POSTS_PER_PAGE = int(os.environ.get('BLOG_POSTS_PER_PAGE', 10))
+
+# Search index written by `manage.py build_search`
+SEARCH_ROOT = Path(os.environ.get('SEARCH_ROOT', STATIC_ROOT / 'search'))
+
+# Static copy of the public pages written by `manage.py export_site`
+EXPORT_ROOT = Path(os.environ.get('EXPORT_ROOT', BASE_DIR / 'export'))
+
+# Serve the exported pages with WhiteNoise, ahead of Django, while the catalog
+# is the one they were exported from; they are read at start-up, so a
+# re-export needs a restart
+SERVE_EXPORTED_SITE = os.environ.get('SERVE_EXPORTED_SITE', 'False') == 'True'
+if SERVE_EXPORTED_SITE:
+    WHITENOISE_ROOT = EXPORT_ROOT
+    WHITENOISE_INDEX_FILE = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -162,3 +244,71 @@ else:
 # Email recipient addresses
 CONTACT_EMAIL = os.environ.get('CONTACT_EMAIL', 'paul@turnpiece.com')
 SUPPORT_EMAIL = os.environ.get('SUPPORT_EMAIL', 'support@turnpiece.com')
+
+# Contact form emails are queued in the database and sent by
+# `manage.py send_outbox` (core.outbox): messages per SMTP connection, seconds
+# a worker holds a claimed batch, attempts before a message is dead-lettered,
+# base retry delay (doubled per attempt) and the --loop polling interval
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_LEASE = int(os.environ.get('OUTBOX_LEASE', 300))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_BACKOFF = int(os.environ.get('OUTBOX_RETRY_BACKOFF', 60))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 5))
+
+# GitHub README cache for documentation pages: entries are fresh for
+# README_CACHE_TTL seconds and served stale (while revalidating) for up to
+# README_CACHE_STALE_TTL seconds
+README_CACHE_TTL = int(os.environ.get('README_CACHE_TTL', 300))
+README_CACHE_STALE_TTL = int(os.environ.get('README_CACHE_STALE_TTL', 86400))
+
+# Upstream HTTP client (core.upstream): timeouts and backoff in seconds; the
+# circuit opens after UPSTREAM_CIRCUIT_THRESHOLD consecutive failures
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', 0.25))
+UPSTREAM_CIRCUIT_THRESHOLD = int(os.environ.get('UPSTREAM_CIRCUIT_THRESHOLD', 5))
+UPSTREAM_CIRCUIT_RESET = int(os.environ.get('UPSTREAM_CIRCUIT_RESET', 30))
+UPSTREAM_NEGATIVE_TTL = int(os.environ.get('UPSTREAM_NEGATIVE_TTL', 30))
+
+# Metrics (core.metrics): each worker writes its metrics to the database every
+# METRICS_FLUSH_INTERVAL seconds, and those of workers that stopped are kept
+# for METRICS_RETENTION seconds. /metrics serves them to requests with the
+# header "Authorization: Bearer <METRICS_TOKEN>" and is disabled without a token.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 15))
+METRICS_RETENTION = int(os.environ.get('METRICS_RETENTION', 86400))
+
+# Base URL every upstream request is sent to instead of its own host, e.g. a
+# local stub server (`manage.py bench` sets this itself)
+UPSTREAM_OVERRIDE_URL = os.environ.get('UPSTREAM_OVERRIDE_URL', '')
+
+# Contact form submissions allowed per client per window (seconds); more are
+# rejected by core.middleware.form_guard_middleware
+CONTACT_RATE_LIMIT = int(os.environ.get('CONTACT_RATE_LIMIT', 3))
+CONTACT_RATE_WINDOW = int(os.environ.get('CONTACT_RATE_WINDOW', 300))
+
+# Where contact form rate limit counters are kept: 'database' (shared by all
+# workers) or 'cache' (the default cache; per process with LocMem)
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'database')
+
+# Header holding the client address set by the proxy in front of the app, e.g.
+# HTTP_X_FORWARDED_FOR on Render, and the number of proxies that append to it.
+# Leave unset when clients connect directly, as the header can be forged.
+RATE_LIMIT_IP_HEADER = os.environ.get('RATE_LIMIT_IP_HEADER', '')
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 1))
+
+# Seconds between checks for catalog changes made in the database, e.g. in the
+# admin (projects.catalog)
+CATALOG_CHECK_INTERVAL = int(os.environ.get('CATALOG_CHECK_INTERVAL', 5))
+
+# Seconds a rendered page stays in the full-page cache (core.pagecache)
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 600))
+
+# Seconds a rendered project or repository card stays in the cache
+# (core.fragments); keys change with the catalog version
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 86400))
+
+# Longest a request waits (seconds) on another worker's in-flight README fetch
+# or render before doing the work itself (core.singleflight)
+SINGLEFLIGHT_WAIT = float(os.environ.get('SINGLEFLIGHT_WAIT', 10))
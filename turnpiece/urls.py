@@ -8,4 +8,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
     path('projects/', include('projects.urls')),
+    path('blog/', include('blog.urls')),
 ]